@@ -1,5 +1,6 @@
 """CLI entry point for Vietnamese Stock Data Collector."""
 
+import itertools
 import logging
 import sys
 from datetime import date, datetime
@@ -7,12 +8,19 @@ from pathlib import Path
 
 import click
 from rich.console import Console
+from rich.live import Live
 from rich.table import Table
 
 from stock_collector.config import load_config
 
 console = Console()
 
+STATUS_STYLES = {
+    "success": "green",
+    "failed": "red",
+    "running": "yellow",
+}
+
 
 def _setup_logging(config):
     """Configure logging based on config."""
@@ -87,7 +95,9 @@ def init_db():
               help="Type of data to backfill")
 @click.option("--period", default="quarter", type=click.Choice(["year", "quarter"]),
               help="Financial period (for financial type)")
-def backfill(start, end, symbols, collect_type, period):
+@click.option("--force", is_flag=True, default=False,
+              help="Fetch financials even for symbols whose latest period is already stored")
+def backfill(start, end, symbols, collect_type, period, force):
     """Thu thập dữ liệu lịch sử (backfill).
 
     Chạy lần đầu để lấy toàn bộ dữ liệu trong quá khứ.
@@ -127,7 +137,7 @@ def backfill(start, end, symbols, collect_type, period):
         console.print("[bold yellow]💰 Step 4: Backfilling financial statements...[/]")
         from stock_collector.collectors.financial import FinancialCollector
         financial = FinancialCollector(config)
-        count = financial.run(symbols=symbol_list, period=period)
+        count = financial.run(symbols=symbol_list, period=period, force=force)
         console.print(f"[green]  ✅ {count} financial records collected[/]\n")
 
     console.print("[bold green]🎉 Backfill completed![/]")
@@ -137,7 +147,9 @@ def backfill(start, end, symbols, collect_type, period):
 @click.option("--type", "-t", "collect_type", default="all",
               type=click.Choice(["all", "listing", "price", "index", "financial"]),
               help="Type of data to collect")
-def collect_daily(collect_type):
+@click.option("--force", is_flag=True, default=False,
+              help="Fetch financials even for symbols whose latest period is already stored")
+def collect_daily(collect_type, force):
     """Thu thập dữ liệu mới nhất (incremental).
 
     Chỉ thu thập dữ liệu chưa có trong DB (từ ngày cuối + 1 đến hôm nay).
@@ -171,7 +183,7 @@ def collect_daily(collect_type):
         console.print("[bold yellow]💰 Collecting financial data...[/]")
         from stock_collector.collectors.financial import FinancialCollector
         financial = FinancialCollector(config)
-        count = financial.run(period="quarter")
+        count = financial.run(period="quarter", force=force)
         console.print(f"[green]  ✅ {count} financial records[/]\n")
 
     console.print("[bold green]🎉 Daily collection completed![/]")
@@ -184,17 +196,25 @@ def status(limit):
     config = _init_app()
 
     from stock_collector.db.engine import get_session
-    from stock_collector.db.models import CollectionLog, DailyPrice, MarketIndex, StockListing
-    from sqlalchemy import func
+    from stock_collector.db.models import CollectionLog
+    from sqlalchemy import select, text
 
     with get_session() as session:
-        # Summary stats
-        listings_count = session.query(func.count(StockListing.symbol)).scalar() or 0
-        prices_count = session.query(func.count(DailyPrice.id)).scalar() or 0
-        indices_count = session.query(func.count(MarketIndex.id)).scalar() or 0
-
-        latest_price_date = session.query(func.max(DailyPrice.trading_date)).scalar()
-        latest_index_date = session.query(func.max(MarketIndex.trading_date)).scalar()
+        # Summary stats — one round-trip for all five aggregates
+        (
+            listings_count,
+            prices_count,
+            indices_count,
+            latest_price_date,
+            latest_index_date,
+        ) = session.execute(text("""
+            SELECT
+                (SELECT count(*) FROM stock_listings),
+                (SELECT count(*) FROM daily_prices),
+                (SELECT count(*) FROM market_indices),
+                (SELECT max(trading_date) FROM daily_prices),
+                (SELECT max(trading_date) FROM market_indices)
+        """)).one()
 
         console.print("\n[bold blue]📊 Database Summary[/]")
         summary = Table(show_header=False, box=None, padding=(0, 2))
@@ -207,16 +227,19 @@ def status(limit):
         summary.add_row("Latest Index Date", str(latest_index_date or "N/A"))
         console.print(summary)
 
-        # Recent collection logs
+        # Recent collection logs — fetched in pages from a server-side cursor and
+        # rendered as they arrive, so large --limit values don't block the UI
         console.print(f"\n[bold blue]📜 Recent Collection Logs (last {limit})[/]")
-        logs = (
-            session.query(CollectionLog)
+        stmt = (
+            select(CollectionLog)
             .order_by(CollectionLog.started_at.desc())
             .limit(limit)
-            .all()
+            .execution_options(yield_per=500)
         )
+        logs = iter(session.execute(stmt).scalars())
+        first = next(logs, None)
 
-        if not logs:
+        if first is None:
             console.print("[dim]No collection logs yet.[/]")
         else:
             table = Table(show_lines=True)
@@ -229,36 +252,28 @@ def status(limit):
             table.add_column("Duration")
             table.add_column("Error")
 
-            for log in logs:
-                status_style = {
-                    "success": "green",
-                    "failed": "red",
-                    "running": "yellow",
-                }.get(str(log.status), "white")
-
-                duration = ""
-                if log.finished_at and log.started_at:  # type: ignore[truthy-bool]
-                    delta = log.finished_at - log.started_at
-                    duration = f"{delta.total_seconds():.1f}s"
-
-                error_msg = (str(log.error_message)[:50] + "...") if log.error_message else ""  # type: ignore[truthy-bool]
-
-                started_str = ""
-                if log.started_at:  # type: ignore[truthy-bool]
-                    started_str = log.started_at.strftime("%Y-%m-%d %H:%M")  # type: ignore[union-attr]
-
-                table.add_row(
-                    str(log.id),
-                    str(log.collection_type),
-                    str(log.symbol) if log.symbol else "-",  # type: ignore[truthy-bool]
-                    f"[{status_style}]{log.status}[/]",
-                    str(log.records_count or 0),
-                    started_str,
-                    duration,
-                    error_msg,
-                )
-
-            console.print(table)
+            with Live(table, console=console, refresh_per_second=10):
+                for log in itertools.chain([first], logs):
+                    status_style = STATUS_STYLES.get(str(log.status), "white")
+
+                    duration = ""
+                    if log.finished_at and log.started_at:  # type: ignore[truthy-bool]
+                        delta = log.finished_at - log.started_at
+                        duration = f"{delta.total_seconds():.1f}s"
+
+                    error_msg = (str(log.error_message)[:50] + "...") if log.error_message else ""  # type: ignore[truthy-bool]
+                    started_str = log.started_at.strftime("%Y-%m-%d %H:%M") if log.started_at else ""  # type: ignore[union-attr]
+
+                    table.add_row(
+                        str(log.id),
+                        str(log.collection_type),
+                        str(log.symbol) if log.symbol else "-",  # type: ignore[truthy-bool]
+                        f"[{status_style}]{log.status}[/]",
+                        str(log.records_count or 0),
+                        started_str,
+                        duration,
+                        error_msg,
+                    )
 
     console.print()
 
@@ -0,0 +1,136 @@
+"""On-disk cache for fetched DataFrames (stale-while-revalidate).
+
+Each entry is stored as ``<cache_dir>/<sha1(key)>.pkl`` with a sidecar
+``.meta.json`` recording when it was fetched. Fresh entries skip the network
+entirely; stale entries are served immediately and refreshed in the background
+when an executor is available.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_refreshing: set[str] = set()
+_refreshing_lock = threading.Lock()
+
+
+def _paths(cache_dir: Path, key: str) -> tuple[Path, Path]:
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return cache_dir / f"{digest}.pkl", cache_dir / f"{digest}.meta.json"
+
+
+def _read(data_path: Path, meta_path: Path) -> Optional[tuple["pd.DataFrame", float]]:
+    """Return (DataFrame, fetched_at) or None if the entry is missing/corrupt.
+
+    Any load failure (truncated file, pickle from an incompatible pandas, ...)
+    is a cache miss; the broken entry is deleted so the next fetch rewrites it.
+    """
+    import pandas as pd
+
+    if not data_path.exists():
+        return None
+    try:
+        with open(meta_path, "r") as f:
+            fetched_at = float(json.load(f)["fetched_at"])
+        return pd.read_pickle(data_path), fetched_at
+    except Exception as e:
+        logger.debug(f"Dropping unreadable cache entry {data_path.name}: {e}")
+        for path in (data_path, meta_path):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+        return None
+
+
+def _write(data_path: Path, meta_path: Path, key: str, df: "pd.DataFrame") -> None:
+    """Write the entry atomically (temp file + rename) so readers never see partial data."""
+    try:
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = data_path.with_suffix(f".{threading.get_ident()}.tmp")
+        df.to_pickle(tmp)
+        os.replace(tmp, data_path)
+        tmp_meta = meta_path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_meta, "w") as f:
+            json.dump({"key": key, "fetched_at": time.time()}, f)
+        os.replace(tmp_meta, meta_path)
+    except Exception as e:
+        logger.debug(f"Failed to write cache entry for {key}: {e}")
+
+
+def _fetch_and_store(
+    key: str, data_path: Path, meta_path: Path, producer: Callable[[], Optional["pd.DataFrame"]]
+) -> Optional["pd.DataFrame"]:
+    df = producer()
+    if df is not None and not df.empty:
+        _write(data_path, meta_path, key, df)
+    return df
+
+
+def _refresh(
+    key: str, data_path: Path, meta_path: Path, producer: Callable[[], Optional["pd.DataFrame"]]
+) -> None:
+    try:
+        _fetch_and_store(key, data_path, meta_path, producer)
+    except Exception as e:
+        logger.debug(f"Background refresh failed for {key}: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+
+def cached_fetch(
+    key: str,
+    ttl: float,
+    producer: Callable[[], Optional["pd.DataFrame"]],
+    cache_dir: Path,
+    executor: Optional[Executor] = None,
+) -> Optional["pd.DataFrame"]:
+    """
+    Return the DataFrame for ``key``, calling ``producer`` only when needed.
+
+    - fresh entry (younger than ``ttl`` seconds): returned without calling ``producer``
+    - stale entry: returned as-is; refreshed on ``executor`` if one is given,
+      otherwise re-fetched synchronously
+    - missing entry: fetched synchronously and stored
+
+    ``ttl <= 0`` disables the cache. Exceptions from ``producer`` propagate on the
+    synchronous path and are logged on the background path.
+    """
+    if ttl <= 0:
+        return producer()
+
+    data_path, meta_path = _paths(cache_dir, key)
+    entry = _read(data_path, meta_path)
+    if entry is None:
+        return _fetch_and_store(key, data_path, meta_path, producer)
+
+    df, fetched_at = entry
+    if time.time() - fetched_at < ttl:
+        return df
+
+    if executor is None:
+        return _fetch_and_store(key, data_path, meta_path, producer)
+
+    with _refreshing_lock:
+        if key in _refreshing:
+            return df
+        _refreshing.add(key)
+    try:
+        executor.submit(_refresh, key, data_path, meta_path, producer)
+    except RuntimeError:
+        # Executor already shut down — the next run will refresh the entry
+        with _refreshing_lock:
+            _refreshing.discard(key)
+    return df
@@ -1,15 +1,27 @@
 """Base collector with shared logic: retry, rate limiting, logging."""
 
+import csv
+import io
 import logging
+import re
+import threading
 import time
 import traceback
 from abc import ABC, abstractmethod
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import date
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.engine import Connection
 
 from stock_collector.config import AppConfig
 from stock_collector.db.engine import get_session
 from stock_collector.db.models import CollectionLog
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 
 # Errors that should NOT be retried (data format issues, not transient)
@@ -33,23 +45,149 @@ RATE_LIMIT_KEYWORDS = [
     "tối đa",
 ]
 
+# Row count above which bulk writes switch from execute_values to COPY
+COPY_THRESHOLD = 500
+
+# Innermost traceback frames stored in collection_logs.error_message
+TRACEBACK_FRAMES = 10
+
+# Compiled once so each check is a single scan over the error message
+_NON_RETRYABLE_RE = re.compile("|".join(map(re.escape, NON_RETRYABLE_KEYWORDS)))
+_RATE_LIMIT_RE = re.compile("|".join(map(re.escape, RATE_LIMIT_KEYWORDS)), re.IGNORECASE)
+
 
 def _is_retryable(error: Exception) -> bool:
     """Check if an error is worth retrying (network/rate-limit) vs permanent (data format)."""
-    error_str = str(error)
-    for keyword in NON_RETRYABLE_KEYWORDS:
-        if keyword in error_str:
-            return False
-    return True
+    return _NON_RETRYABLE_RE.search(str(error)) is None
 
 
 def _is_rate_limited(error: Exception) -> bool:
     """Check if an error is specifically a rate limit error."""
-    error_str = str(error)
-    for keyword in RATE_LIMIT_KEYWORDS:
-        if keyword in error_str:
-            return True
-    return False
+    return _RATE_LIMIT_RE.search(str(error)) is not None
+
+
+def as_date(value: date | str) -> date:
+    """Accept a ``date`` or an ISO ``YYYY-MM-DD`` string (CLI/config boundary)."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def latest_trading_day(end_date: date) -> date:
+    """Latest business day (Mon-Fri) on or before ``end_date``."""
+    import pandas as pd
+    from pandas.tseries.offsets import BDay
+
+    return BDay().rollback(pd.Timestamp(end_date)).date()
+
+
+# vnstock quote.history column names -> daily_prices/market_indices column names
+_OHLCV_COL_MAP = {
+    "time": "trading_date",
+    "date": "trading_date",
+    "TradingDate": "trading_date",
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+    "open": "open",
+    "high": "high",
+    "low": "low",
+    "close": "close",
+    "volume": "volume",
+}
+
+
+def normalize_ohlcv(df: "pd.DataFrame", key_column: str, key: str) -> Optional["pd.DataFrame"]:
+    """Coerce a quote.history frame into the shape ``ohlcv_rows`` expects.
+
+    Columns become ``(key_column, trading_date, open, high, low, close, volume)``
+    with ``key`` filled in, float64 prices, nullable Int64 volume and
+    midnight-normalized dates; rows without a parsable date are dropped.
+    Returns None when the frame has no date column.
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = df.rename(columns=_OHLCV_COL_MAP)
+    if "trading_date" not in df.columns:
+        return None
+
+    # Parse on the ISO fast path and keep datetime64 (midnight); unparsable -> NaT.
+    # psycopg2 and COPY both accept the timestamps for the DATE column.
+    df["trading_date"] = pd.to_datetime(
+        df["trading_date"], format="ISO8601", errors="coerce"
+    ).dt.normalize()
+
+    # Coerce column-wise: missing OHLCV columns become all-NA, unparsable values NA
+    df = df.assign(**{key_column: key}).reindex(
+        columns=[key_column, "trading_date", "open", "high", "low", "close", "volume"]
+    )
+    prices = ["open", "high", "low", "close"]
+    df[prices] = df[prices].apply(pd.to_numeric, errors="coerce").astype("float64")
+    df["volume"] = np.trunc(pd.to_numeric(df["volume"], errors="coerce")).astype("Int64")
+    return df.dropna(subset=["trading_date"])
+
+
+def ohlcv_rows(df: "pd.DataFrame") -> list[tuple]:
+    """Row tuples ``(key, trading_date, open, high, low, close, volume)`` for bulk inserts.
+
+    Expects the coerced frame built by ``normalize_ohlcv`` (key column first,
+    float64 prices, nullable Int64 volume). NaN/NA become None in one NumPy pass per
+    column instead of per-row casts.
+    """
+    import numpy as np
+
+    columns = [df.iloc[:, 0].to_numpy(dtype=object), df["trading_date"].to_numpy(dtype=object)]
+    for name in ("open", "high", "low", "close"):
+        values = df[name].to_numpy(dtype="float64")
+        columns.append(np.where(np.isnan(values), None, values))
+    columns.append(df["volume"].to_numpy(dtype=object, na_value=None))
+    return list(zip(*columns))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at ``rate`` tokens/s up to ``burst`` tokens.
+
+    ``acquire()`` only blocks when the bucket is empty. ``penalize()`` drains the
+    bucket into debt so every caller backs off after the server reports throttling.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, seconds: float) -> None:
+        """Block all callers for roughly ``seconds`` by draining the bucket.
+
+        The debt is capped, not accumulated: concurrent penalties for the same
+        throttling window still add up to one ``seconds`` back-off.
+        """
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
 
 
 class BaseCollector(ABC):
@@ -63,6 +201,10 @@ class BaseCollector(ABC):
         self.max_retries = config.collection.max_retries
         self.retry_delay = config.collection.retry_delay
         self.rate_limit_delay = getattr(config.collection, 'rate_limit_delay', 60)
+        rate = 1 / self.request_delay if self.request_delay > 0 else 0.0
+        self._bucket = TokenBucket(rate=rate, burst=max(1, int(rate)))
+        self._vnstock = None
+        self._client_lock = threading.Lock()
 
     @abstractmethod
     def collect(self, **kwargs) -> int:
@@ -71,54 +213,181 @@ class BaseCollector(ABC):
 
     def run(self, **kwargs) -> int:
         """Execute collection with logging to DB."""
-        log_entry = CollectionLog(
-            collection_type=self.collection_type,
-            symbol=kwargs.get("symbol"),
-            status="running",
-            started_at=datetime.utcnow(),
+        with self._tracked_run(kwargs.get("symbol")) as outcome:
+            records = self.collect(**kwargs)
+            outcome["records_count"] = records
+
+        logger.info(
+            f"[{self.collection_type}] Completed: {records} records"
+            + (f" for {kwargs.get('symbol', '')}" if kwargs.get("symbol") else "")
         )
+        return records
 
+    @contextmanager
+    def _tracked_run(self, symbol: str | None):
+        """Track one run in collection_logs.
+
+        Inserts the "running" row (Core INSERT ... RETURNING id, no ORM flush) in
+        its own short session so it is visible while the body runs, then sets the
+        terminal state with one UPDATE (no re-SELECT). No session is held while
+        the body runs, so its get_session() calls reuse the thread's session.
+        Errors from the body are recorded and re-raised after the UPDATE.
+        """
+        error: Exception | None = None
         with get_session() as session:
-            session.add(log_entry)
-            session.flush()
-            log_id = log_entry.id
+            log_id = session.execute(
+                insert(CollectionLog)
+                .values(
+                    collection_type=self.collection_type,
+                    symbol=symbol,
+                    status="running",
+                )
+                .returning(CollectionLog.id)
+            ).scalar_one()
 
+        outcome: dict = {"records_count": 0}
         try:
-            records = self.collect(**kwargs)
+            yield outcome
+            values = {"status": "success", "records_count": outcome["records_count"]}
+        except Exception as e:
+            error = e
+            # Only the innermost frames — a full trace is built just to be cut at 2000 chars
+            error_msg = f"{type(e).__name__}: {e}\n" + "".join(
+                traceback.format_tb(e.__traceback__, limit=-TRACEBACK_FRAMES)
+            )
+            values = {"status": "failed", "error_message": error_msg[:2000]}
+            logger.error(f"[{self.collection_type}] Failed: {e}")
+
+        with get_session() as session:
+            session.execute(
+                update(CollectionLog)
+                .where(CollectionLog.id == log_id)
+                .values(finished_at=func.timezone("utc", func.now()), **values)
+            )
+
+        if error is not None:
+            raise error
+
+    @staticmethod
+    def _on_conflict(conflict: Sequence[str], update: Sequence[str]) -> str:
+        """ON CONFLICT clause: DO NOTHING, or overwrite ``update`` columns from EXCLUDED."""
+        target = f"ON CONFLICT ({', '.join(conflict)})"
+        if not update:
+            return f"{target} DO NOTHING"
+        return f"{target} DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in update)
+
+    @staticmethod
+    def _dedupe(columns: Sequence[str], rows: list[tuple], conflict: Sequence[str]) -> list[tuple]:
+        """Keep the last row per conflict key.
+
+        DO UPDATE rejects a statement that touches the same row twice
+        ("cannot affect row a second time"), so duplicates must go first.
+        """
+        key_idx = [columns.index(c) for c in conflict]
+        unique = {tuple(row[i] for i in key_idx): row for row in rows}
+        return rows if len(unique) == len(rows) else list(unique.values())
+
+    @classmethod
+    def _bulk_insert(
+        cls,
+        conn: Connection,
+        table: str,
+        columns: Sequence[str],
+        rows: list[tuple],
+        conflict: Sequence[str],
+        update: Sequence[str] = (),
+        page_size: int = 1000,
+    ) -> int:
+        """Insert ``rows`` with multi-row VALUES pages (psycopg2 execute_values).
+
+        Runs inside the caller's transaction. Conflicting rows are skipped, or
+        have their ``update`` columns overwritten when given. Returns the number
+        of rows sent.
+        """
+        from psycopg2.extras import execute_values
 
-            with get_session() as session:
-                log = session.get(CollectionLog, log_id)
-                if log:
-                    log.status = "success"  # type: ignore[assignment]
-                    log.records_count = records  # type: ignore[assignment]
-                    log.finished_at = datetime.utcnow()  # type: ignore[assignment]
+        if update:
+            rows = cls._dedupe(columns, rows, conflict)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s "
+            + cls._on_conflict(conflict, update)
+        )
+        cursor = conn.connection.cursor()
+        try:
+            execute_values(cursor, sql, rows, page_size=page_size)
+        finally:
+            cursor.close()
+        return len(rows)
 
-            logger.info(
-                f"[{self.collection_type}] Completed: {records} records"
-                + (f" for {kwargs.get('symbol', '')}" if kwargs.get("symbol") else "")
+    @classmethod
+    def _copy_insert(
+        cls,
+        conn: Connection,
+        table: str,
+        columns: Sequence[str],
+        rows: list[tuple],
+        conflict: Sequence[str],
+        update: Sequence[str] = (),
+    ) -> int:
+        """Stream ``rows`` through COPY into a temp staging table, then merge.
+
+        Faster than multi-row INSERTs for large backfills; the final
+        INSERT ... SELECT applies the same ON CONFLICT action as _bulk_insert.
+        Runs inside the caller's transaction (the staging table is dropped on commit).
+        """
+        if update:
+            rows = cls._dedupe(columns, rows, conflict)
+        cols = ", ".join(columns)
+        stage = f"_stage_{table}"
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)  # None -> empty field -> NULL in CSV COPY
+        buf.seek(0)
+
+        cursor = conn.connection.cursor()
+        try:
+            # Column types only (no NOT NULL/defaults): COPY must not touch the id sequence
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DROP "
+                f"AS SELECT {cols} FROM {table} WITH NO DATA"
             )
-            return records
+            cursor.execute(f"TRUNCATE {stage}")
+            cursor.copy_expert(f"COPY {stage} ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+            cursor.execute(
+                f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {stage} "
+                + cls._on_conflict(conflict, update)
+            )
+        finally:
+            cursor.close()
+        return len(rows)
 
-        except Exception as e:
-            error_msg = f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
-            with get_session() as session:
-                log = session.get(CollectionLog, log_id)
-                if log:
-                    log.status = "failed"  # type: ignore[assignment]
-                    log.finished_at = datetime.utcnow()  # type: ignore[assignment]
-                    log.error_message = error_msg[:2000]  # type: ignore[assignment]
+    def _client(self):
+        """Shared Vnstock client, created on first use and reused across symbols/threads."""
+        if self._vnstock is None:
+            with self._client_lock:
+                if self._vnstock is None:
+                    from vnstock import Vnstock
+                    self._vnstock = Vnstock()
+        return self._vnstock
 
-            logger.error(f"[{self.collection_type}] Failed: {e}")
-            raise
+    def _quote_history(self, symbol: str, start: date, end: date) -> Optional["pd.DataFrame"]:
+        """Fetch daily bars for ``symbol`` over [start, end] through the rate limiter."""
+        self._rate_limit()
+        stock = self._client().stock(symbol=symbol, source="VCI")
+        return self._retry(
+            stock.quote.history,
+            start=start.isoformat(),
+            end=end.isoformat(),
+            interval="1D",
+        )
 
     def _rate_limit(self):
-        """Sleep to respect rate limits."""
-        time.sleep(self.request_delay)
+        """Wait for a request token (shared by all worker threads of this collector)."""
+        self._bucket.acquire()
 
     def _retry(self, func, *args, **kwargs):
         """Execute a function with smart retry logic.
 
-        - Rate limit errors: wait longer (rate_limit_delay) then retry
+        - Rate limit errors: drain the token bucket for rate_limit_delay then retry
         - Network/transient errors: normal retry with exponential backoff
         - Data format errors: fail immediately, no retry
         """
@@ -136,14 +405,15 @@ class BaseCollector(ABC):
                     )
                     raise
 
-                # Rate limit error — wait much longer
+                # Rate limit error — penalize the bucket so every worker backs off
                 if _is_rate_limited(e):
                     wait = self.rate_limit_delay
                     logger.warning(
                         f"[{self.collection_type}] Rate limited! Waiting {wait}s before retry "
                         f"(attempt {attempt}/{self.max_retries})..."
                     )
-                    time.sleep(wait)
+                    self._bucket.penalize(wait)
+                    self._bucket.acquire()
                     continue
 
                 # Normal transient error — exponential backoff
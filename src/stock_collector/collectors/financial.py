@@ -1,33 +1,118 @@
 """Financial statements collector (income statement & balance sheet)."""
 
-import json
 import logging
-from datetime import datetime
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-import pandas as pd
-from sqlalchemy import text
-from vnstock import Vnstock
+import orjson
+from sqlalchemy import TextClause, text
+from sqlalchemy.engine import Connection
 
+from stock_collector.collectors._cache import cached_fetch
 from stock_collector.collectors.base import BaseCollector
 from stock_collector.config import AppConfig
 from stock_collector.db.engine import get_engine, get_session
-from stock_collector.db.models import (
-    FinancialBalanceSheet,
-    FinancialIncomeStatement,
-    StockListing,
-)
+from stock_collector.db.models import StockListing
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas/numpy/vnstock are imported at the point of use so that importing this
+# module (e.g. for CLI help or status) does not pay their import cost.
 
 logger = logging.getLogger(__name__)
 
+# numpy scalars and non-str column labels are serialized natively by orjson
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+STATEMENT_LABELS = {
+    "income": "income statement",
+    "balance": "balance sheet",
+}
+
+# Logical field -> candidate source column names (first present column wins)
+INCOME_FIELDS = {
+    "revenue": ["revenue", "Revenue", "Doanh thu thuần"],
+    "year_revenue_growth": ["yearRevenueGrowth", "year_revenue_growth"],
+    "cost_of_good_sold": ["costOfGoodSold", "cost_of_good_sold", "Giá vốn hàng bán"],
+    "gross_profit": ["grossProfit", "gross_profit", "Lợi nhuận gộp"],
+    "operation_profit": ["operationProfit", "operation_profit"],
+    "net_income": ["postTaxProfit", "net_income", "netIncome", "Lợi nhuận sau thuế"],
+}
+
+BALANCE_FIELDS = {
+    "total_assets": ["asset", "totalAssets", "total_assets", "Tổng tài sản"],
+    "total_liabilities": ["debt", "totalLiabilities", "total_liabilities", "Tổng nợ"],
+    "equity": ["equity", "Equity", "Vốn chủ sở hữu"],
+}
+
+
+def _target_period(period: str, today: Optional[date] = None) -> tuple[int, int]:
+    """Most recent (year, quarter) that can have been reported; quarter is 0 for annual."""
+    today = today or date.today()
+    if period == "year":
+        return (today.year - 1, 0)
+    quarter = (today.month - 1) // 3  # last completed quarter
+    if quarter == 0:
+        return (today.year - 1, 4)
+    return (today.year, quarter)
+
+
+def _pick_col(df: "pd.DataFrame", keys: list[str]) -> Optional[str]:
+    """Return the first of ``keys`` that is a column of ``df``, or None."""
+    for key in keys:
+        if key in df.columns:
+            return key
+    return None
+
+
+def _numeric_column(df: "pd.DataFrame", col: Optional[str]) -> list[float | None]:
+    """Coerce one column to floats in one pass (NaN -> None); all None if ``col`` is None."""
+    import numpy as np
+    import pandas as pd
+
+    if col is None:
+        return [None] * len(df)
+    values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def _insert_statement(table: str, fields: dict[str, list[str]], raw: bool = False) -> TextClause:
+    """Build the ON CONFLICT DO NOTHING insert for a statement table."""
+    columns = ["symbol", "period", "year", "quarter", *fields]
+    if raw:
+        columns.append("raw_data")
+    return text(f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({", ".join(f":{c}" for c in columns)})
+        ON CONFLICT (symbol, period, year, quarter) DO NOTHING
+    """)
+
 
 class FinancialCollector(BaseCollector):
     """Collect financial statements (income statement & balance sheet)."""
 
     collection_type = "financial"
 
+    # Built once per class so SQLAlchemy's compiled-statement cache hits immediately;
+    # the *_RAW variants also write the raw_data JSONB column (collection.store_raw)
+    _INSERT_INCOME = _insert_statement("financial_income_statements", INCOME_FIELDS)
+    _INSERT_INCOME_RAW = _insert_statement("financial_income_statements", INCOME_FIELDS, raw=True)
+    _INSERT_BALANCE = _insert_statement("financial_balance_sheets", BALANCE_FIELDS)
+    _INSERT_BALANCE_RAW = _insert_statement("financial_balance_sheets", BALANCE_FIELDS, raw=True)
+
     def __init__(self, config: AppConfig):
         super().__init__(config)
+        self._engine = get_engine()
         self.batch_size = config.collection.batch_size
+        self.workers = max(1, config.collection.workers)
+        self.cache_dir = Path(config.collection.cache_dir)
+        self.cache_ttl = config.collection.cache_ttl
+        self.store_raw = getattr(config.collection, "store_raw", False)
+        self._executor: Optional[Executor] = None
+        self._column_cache: dict[tuple, dict[str, Optional[str]]] = {}
 
     def collect(self, **kwargs) -> int:
         """
@@ -36,9 +121,11 @@ class FinancialCollector(BaseCollector):
         kwargs:
             symbols: list[str] — specific symbols (optional, defaults to all)
             period: str — 'year' or 'quarter' (default: 'quarter')
+            force: bool — fetch even symbols whose latest period is already stored
         """
         symbols = kwargs.get("symbols")
         period = kwargs.get("period", "quarter")
+        force = kwargs.get("force", False)
 
         if not symbols:
             symbols = self._get_all_symbols()
@@ -47,17 +134,55 @@ class FinancialCollector(BaseCollector):
             logger.warning("No symbols found. Run listing collector first.")
             return 0
 
-        logger.info(f"Collecting financial data for {len(symbols)} symbols (period={period})")
+        if not force:
+            # Skip symbols that already have the latest reportable period
+            target = _target_period(period)
+            latest = self._latest_periods(period)
+            pending = [s for s in symbols if latest.get(s, (0, 0)) < target]
+            if len(pending) < len(symbols):
+                logger.info(
+                    f"{len(symbols) - len(pending)} symbols already have "
+                    f"{target[0]}{f' Q{target[1]}' if target[1] else ''} data (skipped)"
+                )
+            symbols = pending
+            if not symbols:
+                return 0
+
+        logger.info(
+            f"Collecting financial data for {len(symbols)} symbols "
+            f"(period={period}, workers={self.workers})"
+        )
 
         total_records = 0
         failed_symbols = []
         skipped_symbols = []
 
-        for i, symbol in enumerate(symbols):
-            try:
-                records = self._collect_symbol(symbol, period)
-                total_records += records
-                self._rate_limit()
+        # vnstock calls are I/O-bound, so threads overlap network waits; the shared
+        # _rate_limit() keeps the global request rate bounded across workers.
+        # fetch_pool runs each symbol's two statement fetches; it is separate from
+        # the symbol pool so a worker waiting on its fetches can't starve them.
+        with ThreadPoolExecutor(max_workers=self.workers) as executor, ThreadPoolExecutor(
+            max_workers=2 * self.workers
+        ) as fetch_pool:
+            # Stale cache entries are refreshed on the same pool (see _cache.cached_fetch)
+            self._executor = executor
+            futures = {
+                executor.submit(self._collect_symbol, symbol, period, fetch_pool): symbol
+                for symbol in symbols
+            }
+            for i, future in enumerate(as_completed(futures)):
+                symbol = futures[future]
+                try:
+                    total_records += future.result()
+                except Exception as e:
+                    error_str = str(e)
+                    # Data format errors = skip, don't count as failure
+                    if "are in the [columns]" in error_str or "KeyError" in error_str:
+                        skipped_symbols.append(symbol)
+                        logger.debug(f"{symbol}: no financial data available (skipped)")
+                    else:
+                        failed_symbols.append(symbol)
+                        logger.error(f"Failed to collect financials for {symbol}: {e}")
 
                 if (i + 1) % 50 == 0:
                     logger.info(
@@ -65,17 +190,7 @@ class FinancialCollector(BaseCollector):
                         f"{total_records} records | {len(failed_symbols)} failed | "
                         f"{len(skipped_symbols)} skipped"
                     )
-
-            except Exception as e:
-                error_str = str(e)
-                # Data format errors = skip, don't count as failure
-                if "are in the [columns]" in error_str or "KeyError" in error_str:
-                    skipped_symbols.append(symbol)
-                    logger.debug(f"{symbol}: no financial data available (skipped)")
-                else:
-                    failed_symbols.append(symbol)
-                    logger.error(f"Failed to collect financials for {symbol}: {e}")
-                continue
+        self._executor = None
 
         if failed_symbols:
             logger.warning(f"Failed symbols ({len(failed_symbols)}): {failed_symbols[:20]}")
@@ -84,12 +199,12 @@ class FinancialCollector(BaseCollector):
 
         return total_records
 
-    def _collect_symbol(self, symbol: str, period: str) -> int:
+    def _collect_symbol(self, symbol: str, period: str, fetch_pool: Executor) -> int:
         """Collect income statement and balance sheet for one symbol."""
         records = 0
 
         try:
-            stock = Vnstock().stock(symbol=symbol, source="VCI")
+            stock = self._client().stock(symbol=symbol, source="VCI")
         except Exception as e:
             logger.error(f"{symbol}: failed to initialize stock object: {e}")
             return 0
@@ -98,169 +213,184 @@ class FinancialCollector(BaseCollector):
             logger.debug(f"{symbol}: finance module not available")
             return 0
 
-        # Income Statement — no retry for data format errors
+        # The two statements are independent: fetch them concurrently on the shared
+        # fetch pool (each still takes a token from the shared rate limiter)
+        finance = stock.finance
+        f_income = fetch_pool.submit(
+            self._fetch_statement, symbol, "income", finance.income_statement, period
+        )
+        f_balance = fetch_pool.submit(
+            self._fetch_statement, symbol, "balance", finance.balance_sheet, period
+        )
+        income_df = f_income.result()
+        balance_df = f_balance.result()
+
+        if income_df is None and balance_df is None:
+            return 0
+
+        # One pooled connection and one transaction per symbol for both statements
         try:
-            finance = stock.finance
-            income_df = finance.income_statement(period=period, lang="vi")
-            if income_df is not None and not income_df.empty:
-                r = self._save_income_statement(symbol, period, income_df)
-                records += r
-                logger.debug(f"{symbol}: saved {r} income statement records")
+            with self._engine.begin() as conn:
+                if income_df is not None:
+                    r = self._save_income_statement(symbol, period, income_df, conn)
+                    records += r
+                    logger.debug(f"{symbol}: saved {r} income statement records")
+                if balance_df is not None:
+                    r = self._save_balance_sheet(symbol, period, balance_df, conn)
+                    records += r
+                    logger.debug(f"{symbol}: saved {r} balance sheet records")
         except Exception as e:
-            if "are in the [columns]" in str(e) or "KeyError" in str(e):
-                logger.debug(f"{symbol}: income statement data not available")
-            else:
-                logger.warning(f"{symbol}: income statement error: {e}")
+            # Propagate so collect() records the symbol as failed
+            logger.warning(f"{symbol}: failed to save financial statements: {e}")
+            raise
+
+        return records
 
-        self._rate_limit()
+    def _fetch_statement(self, symbol: str, kind: str, fetch, period: str) -> Optional["pd.DataFrame"]:
+        """Fetch one statement through the disk cache; returns None when empty or unavailable.
+
+        No retry for data format errors.
+        """
+        label = STATEMENT_LABELS[kind]
+
+        def produce():
+            self._rate_limit()
+            return fetch(period=period, lang="vi")
 
-        # Balance Sheet — no retry for data format errors
         try:
-            finance = stock.finance
-            balance_df = finance.balance_sheet(period=period, lang="vi")
-            if balance_df is not None and not balance_df.empty:
-                r = self._save_balance_sheet(symbol, period, balance_df)
-                records += r
-                logger.debug(f"{symbol}: saved {r} balance sheet records")
+            df = cached_fetch(
+                f"{symbol}:{period}:{kind}",
+                self.cache_ttl,
+                produce,
+                self.cache_dir,
+                executor=self._executor,
+            )
         except Exception as e:
             if "are in the [columns]" in str(e) or "KeyError" in str(e):
-                logger.debug(f"{symbol}: balance sheet data not available")
+                logger.debug(f"{symbol}: {label} data not available")
             else:
-                logger.warning(f"{symbol}: balance sheet error: {e}")
+                logger.warning(f"{symbol}: {label} error: {e}")
+            return None
+
+        if df is None or df.empty:
+            return None
+        return df
+
+    def _save_income_statement(
+        self, symbol: str, period: str, df: "pd.DataFrame", conn: Connection
+    ) -> int:
+        """Save income statement data with ON CONFLICT DO NOTHING (single executemany)."""
+        params = self._build_params(symbol, period, df, INCOME_FIELDS, self.store_raw)
+        if not params:
+            return 0
 
-        return records
+        # One executemany round-trip instead of one INSERT per row
+        conn.execute(self._INSERT_INCOME_RAW if self.store_raw else self._INSERT_INCOME, params)
 
-    def _save_income_statement(self, symbol: str, period: str, df: pd.DataFrame) -> int:
-        """Save income statement data with ON CONFLICT DO NOTHING."""
-        records = 0
-        engine = get_engine()
-
-        insert_sql = text("""
-            INSERT INTO financial_income_statements
-                (symbol, period, year, quarter, revenue, year_revenue_growth,
-                 cost_of_good_sold, gross_profit, operation_profit, net_income, raw_data)
-            VALUES
-                (:symbol, :period, :year, :quarter, :revenue, :year_revenue_growth,
-                 :cost_of_good_sold, :gross_profit, :operation_profit, :net_income, :raw_data)
-            ON CONFLICT (symbol, period, year, quarter) DO NOTHING
-        """)
-
-        with engine.begin() as conn:
-            for _, row in df.iterrows():
-                try:
-                    year_raw = row.get("year", row.get("Year", 0))
-                    year_val = int(year_raw) if year_raw is not None else 0
-                    quarter_raw = row.get("quarter", row.get("Quarter"))
-                    if quarter_raw is not None and bool(pd.notna(quarter_raw)):
-                        quarter_val = int(quarter_raw)
-                    else:
-                        quarter_val = 0  # Use 0 for annual (NOT NULL in unique constraint)
-
-                    # Build raw_data JSON from all columns
-                    raw = {}
-                    for col in df.columns:
-                        val = row[col]
-                        if val is not None and bool(pd.notna(val)):
-                            raw[col] = val if not hasattr(val, 'item') else val.item()
-
-                    conn.execute(
-                        insert_sql,
-                        {
-                            "symbol": symbol,
-                            "period": period,
-                            "year": year_val,
-                            "quarter": quarter_val,
-                            "revenue": self._safe_numeric(row, ["revenue", "Revenue", "Doanh thu thuần"]),
-                            "year_revenue_growth": self._safe_numeric(
-                                row, ["yearRevenueGrowth", "year_revenue_growth"]
-                            ),
-                            "cost_of_good_sold": self._safe_numeric(
-                                row, ["costOfGoodSold", "cost_of_good_sold", "Giá vốn hàng bán"]
-                            ),
-                            "gross_profit": self._safe_numeric(
-                                row, ["grossProfit", "gross_profit", "Lợi nhuận gộp"]
-                            ),
-                            "operation_profit": self._safe_numeric(
-                                row, ["operationProfit", "operation_profit"]
-                            ),
-                            "net_income": self._safe_numeric(
-                                row, ["postTaxProfit", "net_income", "netIncome", "Lợi nhuận sau thuế"]
-                            ),
-                            "raw_data": json.dumps(raw, default=str, ensure_ascii=False),
-                        },
-                    )
-                    records += 1
-                except Exception as e:
-                    logger.debug(f"Income insert error {symbol}: {e}")
+        return len(params)
 
-        return records
+    def _save_balance_sheet(
+        self, symbol: str, period: str, df: "pd.DataFrame", conn: Connection
+    ) -> int:
+        """Save balance sheet data with ON CONFLICT DO NOTHING (single executemany)."""
+        params = self._build_params(symbol, period, df, BALANCE_FIELDS, self.store_raw)
+        if not params:
+            return 0
 
-    def _save_balance_sheet(self, symbol: str, period: str, df: pd.DataFrame) -> int:
-        """Save balance sheet data with ON CONFLICT DO NOTHING."""
-        records = 0
-        engine = get_engine()
-
-        insert_sql = text("""
-            INSERT INTO financial_balance_sheets
-                (symbol, period, year, quarter, total_assets, total_liabilities, equity, raw_data)
-            VALUES
-                (:symbol, :period, :year, :quarter, :total_assets, :total_liabilities, :equity, :raw_data)
-            ON CONFLICT (symbol, period, year, quarter) DO NOTHING
-        """)
-
-        with engine.begin() as conn:
-            for _, row in df.iterrows():
-                try:
-                    year_raw = row.get("year", row.get("Year", 0))
-                    year_val = int(year_raw) if year_raw is not None else 0
-                    quarter_raw = row.get("quarter", row.get("Quarter"))
-                    if quarter_raw is not None and bool(pd.notna(quarter_raw)):
-                        quarter_val = int(quarter_raw)
-                    else:
-                        quarter_val = 0
-
-                    raw = {}
-                    for col in df.columns:
-                        val = row[col]
-                        if val is not None and bool(pd.notna(val)):
-                            raw[col] = val if not hasattr(val, 'item') else val.item()
-
-                    conn.execute(
-                        insert_sql,
-                        {
-                            "symbol": symbol,
-                            "period": period,
-                            "year": year_val,
-                            "quarter": quarter_val,
-                            "total_assets": self._safe_numeric(
-                                row, ["asset", "totalAssets", "total_assets", "Tổng tài sản"]
-                            ),
-                            "total_liabilities": self._safe_numeric(
-                                row, ["debt", "totalLiabilities", "total_liabilities", "Tổng nợ"]
-                            ),
-                            "equity": self._safe_numeric(
-                                row, ["equity", "Equity", "Vốn chủ sở hữu"]
-                            ),
-                            "raw_data": json.dumps(raw, default=str, ensure_ascii=False),
-                        },
-                    )
-                    records += 1
-                except Exception as e:
-                    logger.debug(f"Balance insert error {symbol}: {e}")
+        conn.execute(self._INSERT_BALANCE_RAW if self.store_raw else self._INSERT_BALANCE, params)
 
-        return records
+        return len(params)
 
-    @staticmethod
-    def _safe_numeric(row, keys: list) -> float | None:
-        """Safely extract a numeric value from a DataFrame row by trying multiple key names."""
-        for key in keys:
-            val = row.get(key)
-            if val is not None and pd.notna(val):
-                try:
-                    return float(val)
-                except (ValueError, TypeError):
-                    continue
-        return None
+    def _resolve_columns(
+        self, df: "pd.DataFrame", fields: dict[str, list[str]]
+    ) -> dict[str, Optional[str]]:
+        """Map year/quarter and each logical field to its source column.
+
+        vnstock returns the same schema for almost every symbol, so the mapping is
+        memoized per (fields, columns) and resolved only once per distinct schema.
+        """
+        key = (tuple(fields), tuple(df.columns))
+        resolved = self._column_cache.get(key)
+        if resolved is None:
+            resolved = {
+                "year": _pick_col(df, ["year", "Year"]),
+                "quarter": _pick_col(df, ["quarter", "Quarter"]),
+            }
+            resolved.update({name: _pick_col(df, keys) for name, keys in fields.items()})
+            self._column_cache[key] = resolved
+        return resolved
+
+    def _build_params(
+        self,
+        symbol: str,
+        period: str,
+        df: "pd.DataFrame",
+        fields: dict[str, list[str]],
+        store_raw: bool = False,
+    ) -> list[dict]:
+        """Build executemany parameters column-wise instead of row by row.
+
+        Each logical field is resolved to its source column (see _resolve_columns), coerced with
+        ``pd.to_numeric`` as a whole column, and rows without a usable year are dropped.
+        ``raw_data`` is only serialized when ``store_raw`` is set.
+        """
+        import numpy as np
+        import pandas as pd
+
+        n = len(df)
+        columns = self._resolve_columns(df, fields)
+        year_col = columns["year"]
+        if year_col is not None:
+            years = pd.to_numeric(df[year_col], errors="coerce").to_numpy(dtype="float64")
+        else:
+            years = np.zeros(n)
+        quarter_col = columns["quarter"]
+        if quarter_col is not None:
+            # Use 0 for annual (NOT NULL in unique constraint)
+            quarters = pd.to_numeric(df[quarter_col], errors="coerce").fillna(0).to_numpy(dtype="float64")
+        else:
+            quarters = np.zeros(n)
+
+        numeric = {name: _numeric_column(df, columns[name]) for name in fields}
+
+        # Build raw_data JSON from all columns: NaN -> None once for the whole frame
+        # (object dtype so None survives), then one C-level to_dict pass
+        raw_rows = []
+        if store_raw:
+            raw_rows = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+        params = []
+        for i in range(n):
+            if np.isnan(years[i]):
+                logger.debug(f"{symbol}: skipping row {i} without a valid year")
+                continue
+            row = {
+                "symbol": symbol,
+                "period": period,
+                "year": int(years[i]),
+                "quarter": int(quarters[i]),
+            }
+            if store_raw:
+                raw = {col: val for col, val in raw_rows[i].items() if val is not None}
+                row["raw_data"] = orjson.dumps(raw, default=str, option=_ORJSON_OPTIONS).decode("utf-8")
+            for name, values in numeric.items():
+                row[name] = values[i]
+            params.append(row)
+        return params
+
+    def _latest_periods(self, period: str) -> dict[str, tuple[int, int]]:
+        """Latest stored (year, quarter) per symbol, from one GROUP BY query."""
+        with self._engine.connect() as conn:
+            rows = conn.execute(
+                text("""
+                    SELECT symbol, MAX(year * 10 + quarter)
+                    FROM financial_income_statements
+                    WHERE period = :period
+                    GROUP BY symbol
+                """),
+                {"period": period},
+            ).all()
+        return {symbol: divmod(int(value), 10) for symbol, value in rows if value is not None}
 
     def _get_all_symbols(self) -> list[str]:
         """Get all active symbols."""
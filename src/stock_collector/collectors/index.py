@@ -3,17 +3,25 @@
 import logging
 from datetime import date, timedelta
 
-import pandas as pd
-from sqlalchemy import func, text
-from vnstock import Vnstock
-
-from stock_collector.collectors.base import BaseCollector
+from sqlalchemy import func
+
+from stock_collector.collectors.base import (
+    COPY_THRESHOLD,
+    BaseCollector,
+    as_date,
+    latest_trading_day,
+    normalize_ohlcv,
+    ohlcv_rows,
+)
 from stock_collector.config import AppConfig
 from stock_collector.db.engine import get_engine, get_session
 from stock_collector.db.models import MarketIndex
 
 logger = logging.getLogger(__name__)
 
+# market_indices columns written by this collector, in row-tuple order
+_COLUMNS = ("index_name", "trading_date", "open", "high", "low", "close", "volume")
+
 
 class IndexCollector(BaseCollector):
     """Collect market index data with incremental support."""
@@ -22,6 +30,8 @@ class IndexCollector(BaseCollector):
 
     def __init__(self, config: AppConfig):
         super().__init__(config)
+        self.default_start_date = as_date(config.collection.default_start_date)
+        self._last_dates: dict[str, date] = {}
 
     def collect(self, **kwargs) -> int:
         """
@@ -29,128 +39,120 @@ class IndexCollector(BaseCollector):
 
         kwargs:
             indices: list[str] — index names (default from config)
-            start_date: str — for backfill
-            end_date: str — for backfill
+            start_date: str | date — for backfill
+            end_date: str | date — for backfill
             mode: str — 'backfill' or 'incremental'
         """
         mode = kwargs.get("mode", "incremental")
         indices = kwargs.get("indices", self.config.indices)
-        start_date = kwargs.get("start_date", self.config.collection.default_start_date)
-        end_date = kwargs.get("end_date", date.today().strftime("%Y-%m-%d"))
-
-        total_records = 0
-
+        start_date = as_date(kwargs.get("start_date") or self.default_start_date)
+        end_date = as_date(kwargs.get("end_date") or date.today())
+
+        self._last_dates = {}
+        if mode == "incremental":
+            # One query for every last stored date instead of one per index
+            self._last_dates = self._get_last_dates()
+            # Already holding the latest trading day: skip the HTTP call and rate-limit wait
+            latest = latest_trading_day(end_date)
+            pending = [s for s in indices if self._last_dates.get(s, date.min) < latest]
+            if len(pending) < len(indices):
+                logger.info(
+                    f"{len(indices) - len(pending)} indices already up-to-date through {latest} (skipped)"
+                )
+            indices = pending
+
+        # Fetch everything first so no transaction stays open across API calls
+        fetched: dict[str, list[tuple]] = {}
         for index_name in indices:
             try:
                 if mode == "incremental":
-                    records = self._collect_incremental(index_name, end_date)
+                    fetched[index_name] = self._collect_incremental(index_name, end_date)
                 else:
-                    records = self._collect_backfill(index_name, start_date, end_date)
-                total_records += records
-                self._rate_limit()
+                    fetched[index_name] = self._collect_backfill(index_name, start_date, end_date)
             except Exception as e:
                 logger.error(f"Failed to collect index {index_name}: {e}")
 
+        return self._save_all(fetched)
+
+    def _save_all(self, fetched: dict[str, list[tuple]]) -> int:
+        """Write every index's rows in one transaction (one commit for the whole run).
+
+        Each index gets its own savepoint so a failed insert only loses that index.
+        """
+        if not any(fetched.values()):
+            return 0
+
+        total_records = 0
+        with get_engine().begin() as conn:
+            for index_name, rows in fetched.items():
+                if not rows:
+                    continue
+                # Large ranges (backfills) go through COPY; small incremental batches
+                # are cheaper as a single execute_values page
+                insert = self._copy_insert if len(rows) > COPY_THRESHOLD else self._bulk_insert
+                try:
+                    with conn.begin_nested():
+                        records = insert(
+                            conn,
+                            "market_indices",
+                            _COLUMNS,
+                            rows,
+                            conflict=("index_name", "trading_date"),
+                            update=_COLUMNS[2:],
+                        )
+                except Exception as e:
+                    logger.error(f"Failed to save index {index_name}: {e}")
+                    continue
+                logger.info(f"{index_name}: saved {records} records")
+                total_records += records
+
         return total_records
 
-    def _collect_incremental(self, index_name: str, end_date: str) -> int:
+    def _collect_incremental(self, index_name: str, end_date: date) -> list[tuple]:
         """Incremental: only fetch from last date in DB."""
-        last_date = self._get_last_date(index_name)
+        last_date = self._last_dates.get(index_name)
 
         if last_date:
-            start = (last_date + timedelta(days=1)).strftime("%Y-%m-%d")
+            start = last_date + timedelta(days=1)
             if start > end_date:
                 logger.debug(f"{index_name}: already up-to-date (last={last_date})")
-                return 0
+                return []
         else:
-            start = self.config.collection.default_start_date
+            start = self.default_start_date
 
         logger.info(f"{index_name}: incremental from {start} to {end_date}")
-        return self._fetch_and_save(index_name, start, end_date)
+        return self._fetch_rows(index_name, start, end_date)
 
-    def _collect_backfill(self, index_name: str, start_date: str, end_date: str) -> int:
+    def _collect_backfill(self, index_name: str, start_date: date, end_date: date) -> list[tuple]:
         """Backfill full range."""
         logger.info(f"{index_name}: backfill from {start_date} to {end_date}")
-        return self._fetch_and_save(index_name, start_date, end_date)
+        return self._fetch_rows(index_name, start_date, end_date)
 
-    def _fetch_and_save(self, index_name: str, start_date: str, end_date: str) -> int:
-        """Fetch index data from vnstock and save to DB."""
+    def _fetch_rows(self, index_name: str, start_date: date, end_date: date) -> list[tuple]:
+        """Fetch index data from vnstock and shape it into market_indices rows."""
         try:
-            stock = Vnstock().stock(symbol=index_name, source="VCI")
-            df = self._retry(
-                stock.quote.history,
-                start=start_date,
-                end=end_date,
-                interval="1D",
-            )
+            df = self._quote_history(index_name, start_date, end_date)
         except Exception as e:
             logger.error(f"API error for index {index_name}: {e}")
-            return 0
+            return []
 
         if df is None or df.empty:
             logger.debug(f"{index_name}: no data returned")
-            return 0
+            return []
 
-        # Normalize columns
-        col_map = {
-            "time": "trading_date",
-            "date": "trading_date",
-            "TradingDate": "trading_date",
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Volume": "volume",
-            "open": "open",
-            "high": "high",
-            "low": "low",
-            "close": "close",
-            "volume": "volume",
-        }
-        df = df.rename(columns={k: v for k, v in col_map.items() if k in df.columns})
-
-        if "trading_date" not in df.columns:
-            logger.warning(f"{index_name}: 'trading_date' column not found. Columns: {list(df.columns)}")
-            return 0
-
-        df["trading_date"] = pd.to_datetime(df["trading_date"]).dt.date
-
-        records = 0
-        engine = get_engine()
-        insert_sql = text("""
-            INSERT INTO market_indices (index_name, trading_date, open, high, low, close, volume)
-            VALUES (:index_name, :trading_date, :open, :high, :low, :close, :volume)
-            ON CONFLICT (index_name, trading_date) DO NOTHING
-        """)
-
-        with engine.begin() as conn:
-            for _, row in df.iterrows():
-                try:
-                    conn.execute(
-                        insert_sql,
-                        {
-                            "index_name": index_name,
-                            "trading_date": row["trading_date"],
-                            "open": float(row.get("open", 0)) if pd.notna(row.get("open")) else None,
-                            "high": float(row.get("high", 0)) if pd.notna(row.get("high")) else None,
-                            "low": float(row.get("low", 0)) if pd.notna(row.get("low")) else None,
-                            "close": float(row.get("close", 0)) if pd.notna(row.get("close")) else None,
-                            "volume": int(row.get("volume", 0)) if pd.notna(row.get("volume")) else None,
-                        },
-                    )
-                    records += 1
-                except Exception as e:
-                    logger.debug(f"Index insert error {index_name}: {e}")
+        df = normalize_ohlcv(df, "index_name", index_name)
+        if df is None:
+            logger.warning(f"{index_name}: 'trading_date' column not found in API response")
+            return []
 
-        logger.info(f"{index_name}: saved {records} records")
-        return records
+        # NaN/NA -> None column-wise; _save_all upserts them in bulk
+        return ohlcv_rows(df)
 
-    def _get_last_date(self, index_name: str) -> date | None:
-        """Get the most recent trading_date for an index in DB."""
+    def _get_last_dates(self) -> dict[str, date]:
+        """Get the most recent trading_date of every index in DB (one GROUP BY query)."""
         with get_session() as session:
-            result = (
-                session.query(func.max(MarketIndex.trading_date))
-                .filter(MarketIndex.index_name == index_name)
-                .scalar()
+            return dict(
+                session.query(MarketIndex.index_name, func.max(MarketIndex.trading_date))
+                .group_by(MarketIndex.index_name)
+                .all()
             )
-            return result
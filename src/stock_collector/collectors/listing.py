@@ -1,19 +1,40 @@
 """Stock listing collector - fetches all listed symbols."""
 
 import logging
-from datetime import datetime
 
 import pandas as pd
-from vnstock import Vnstock
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from stock_collector.collectors.base import BaseCollector
 from stock_collector.config import AppConfig
-from stock_collector.db.engine import get_session
+from stock_collector.db.engine import get_engine
 from stock_collector.db.models import StockListing
 
 logger = logging.getLogger(__name__)
 
 
+def _upsert_listings(table, conn, keys, data_iter) -> int:
+    """``to_sql`` insertion method: upsert a chunk of listings on ``symbol``.
+
+    Existing rows keep their status, creation time and (when the API returns
+    none) their stored name.
+    """
+    # The model's table, not pandas' frame-derived one: it knows updated_at
+    target = StockListing.__table__
+    stmt = pg_insert(target).values([dict(zip(keys, row)) for row in data_iter])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol"],
+        set_={
+            "organ_name": func.coalesce(
+                func.nullif(stmt.excluded.organ_name, ""), target.c.organ_name
+            ),
+            "updated_at": func.timezone("utc", func.now()),
+        },
+    )
+    return conn.execute(stmt).rowcount
+
+
 class ListingCollector(BaseCollector):
     """Collect and update the list of all stock symbols."""
 
@@ -27,7 +48,7 @@ class ListingCollector(BaseCollector):
         logger.info("Fetching all stock symbols...")
 
         # vnstock requires a symbol to create stock object, use any valid one
-        stock = Vnstock().stock(symbol="VNM", source="VCI")
+        stock = self._client().stock(symbol="VNM", source="VCI")
         df = self._retry(stock.listing.all_symbols)
 
         if df is None or df.empty:
@@ -36,31 +57,29 @@ class ListingCollector(BaseCollector):
 
         logger.info(f"Fetched {len(df)} symbols from API. Columns: {list(df.columns)}")
 
-        count = 0
-        with get_session() as session:
-            for _, row in df.iterrows():
-                symbol = str(row.get("symbol", row.get("ticker", ""))).strip().upper()
-                if not symbol:
-                    continue
-
-                organ_name = row.get("organ_name", row.get("organName"))
-
-                existing = session.get(StockListing, symbol)
-                if existing:
-                    # Update existing record
-                    if organ_name:
-                        existing.organ_name = organ_name
-                    existing.updated_at = datetime.utcnow()  # type: ignore[assignment]
-                else:
-                    # Insert new record
-                    listing = StockListing(
-                        symbol=symbol,
-                        organ_name=organ_name,
-                        status="listed",
-                    )
-                    session.add(listing)
-
-                count += 1
+        # Normalize symbols and names column-wise; last occurrence wins on duplicates
+        symbol_col = "symbol" if "symbol" in df.columns else "ticker"
+        name_col = "organ_name" if "organ_name" in df.columns else "organName"
+        listings = pd.DataFrame({
+            "symbol": df[symbol_col].astype(str).str.strip().str.upper(),
+            "organ_name": df[name_col] if name_col in df.columns else None,
+        })
+        listings = listings[listings["symbol"].astype(bool)].drop_duplicates("symbol", keep="last")
+        listings = listings.astype(object).where(listings.notna(), None)
+
+        # created_at/updated_at are filled in by the server
+        listings = listings.assign(status="listed")
+
+        # One multi-row INSERT ... ON CONFLICT per chunk instead of per-row ORM objects
+        listings.to_sql(
+            StockListing.__tablename__,
+            get_engine(),
+            if_exists="append",
+            index=False,
+            chunksize=1000,
+            method=_upsert_listings,
+        )
+        count = len(listings)
 
         logger.info(f"Upserted {count} stock listings.")
         return count
@@ -1,19 +1,30 @@
 """Daily price (OHLCV) collector with incremental logic."""
 
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timedelta
-
-import pandas as pd
-from sqlalchemy import func, text
-from vnstock import Vnstock
-
-from stock_collector.collectors.base import BaseCollector
+from typing import Optional
+
+from sqlalchemy import func
+
+from stock_collector.collectors.base import (
+    COPY_THRESHOLD,
+    BaseCollector,
+    as_date,
+    latest_trading_day,
+    normalize_ohlcv,
+    ohlcv_rows,
+)
 from stock_collector.config import AppConfig
 from stock_collector.db.engine import get_engine, get_session
 from stock_collector.db.models import DailyPrice, StockListing
 
 logger = logging.getLogger(__name__)
 
+# Rows buffered by the writer thread before each bulk load
+FLUSH_ROWS = 10_000
 
 class PriceCollector(BaseCollector):
     """Collect daily OHLCV price data with incremental support."""
@@ -22,7 +33,13 @@ class PriceCollector(BaseCollector):
 
     def __init__(self, config: AppConfig):
         super().__init__(config)
+        self.default_start_date = as_date(config.collection.default_start_date)
         self.batch_size = config.collection.batch_size
+        self.workers = max(1, config.collection.workers)
+        self._last_dates: dict[str, date] = {}
+        self._queue: queue.Queue[Optional[tuple[str, list[tuple]]]] = queue.Queue(maxsize=32)
+        self._written = 0
+        self._write_failed: list[str] = []
 
     def collect(self, **kwargs) -> int:
         """
@@ -30,14 +47,14 @@ class PriceCollector(BaseCollector):
 
         kwargs:
             symbols: list[str] — specific symbols to collect (optional, defaults to all)
-            start_date: str — start date for backfill mode (YYYY-MM-DD)
-            end_date: str — end date for backfill mode (YYYY-MM-DD)
+            start_date: str | date — start date for backfill mode (YYYY-MM-DD)
+            end_date: str | date — end date for backfill mode (YYYY-MM-DD)
             mode: str — 'backfill' or 'incremental' (default: 'incremental')
         """
         mode = kwargs.get("mode", "incremental")
         symbols = kwargs.get("symbols")
-        start_date = kwargs.get("start_date", self.config.collection.default_start_date)
-        end_date = kwargs.get("end_date", date.today().strftime("%Y-%m-%d"))
+        start_date = as_date(kwargs.get("start_date") or self.default_start_date)
+        end_date = as_date(kwargs.get("end_date") or date.today())
 
         # Get symbols list
         if not symbols:
@@ -47,69 +64,98 @@ class PriceCollector(BaseCollector):
             logger.warning("No symbols found. Run listing collector first.")
             return 0
 
-        logger.info(f"Collecting prices for {len(symbols)} symbols (mode={mode})")
+        logger.info(
+            f"Collecting prices for {len(symbols)} symbols "
+            f"(mode={mode}, workers={self.workers})"
+        )
+
+        self._last_dates = {}
+        if mode == "incremental":
+            # One query for every last stored date instead of one per symbol
+            self._last_dates = self._get_last_dates()
+            # Already holding the latest trading day: skip the HTTP call and rate-limit wait
+            latest = latest_trading_day(end_date)
+            pending = [s for s in symbols if self._last_dates.get(s, date.min) < latest]
+            if len(pending) < len(symbols):
+                logger.info(
+                    f"{len(symbols) - len(pending)} symbols already up-to-date through {latest} (skipped)"
+                )
+            symbols = pending
 
-        total_records = 0
         failed_symbols = []
 
-        # Process in batches
-        for i in range(0, len(symbols), self.batch_size):
-            batch = symbols[i : i + self.batch_size]
-            batch_num = i // self.batch_size + 1
-            total_batches = (len(symbols) + self.batch_size - 1) // self.batch_size
-            logger.info(f"Processing batch {batch_num}/{total_batches} ({len(batch)} symbols)")
-
-            for symbol in batch:
-                try:
-                    if mode == "incremental":
-                        records = self._collect_incremental(symbol, end_date)
-                    else:
-                        records = self._collect_backfill(symbol, start_date, end_date)
-
-                    total_records += records
-                    self._rate_limit()
-
-                except Exception as e:
-                    logger.error(f"Failed to collect {symbol}: {e}")
-                    failed_symbols.append(symbol)
-                    continue
+        # API workers only fetch and shape rows; a single writer thread owns the DB
+        # side, so no worker holds a connection while waiting on the network.
+        self._queue = queue.Queue(maxsize=32)
+        self._written = 0
+        self._write_failed = []
+        writer = threading.Thread(target=self._drain_queue, name="price-writer", daemon=True)
+        writer.start()
 
+        try:
+            # Process in batches
+            for i in range(0, len(symbols), self.batch_size):
+                batch = symbols[i : i + self.batch_size]
+                batch_num = i // self.batch_size + 1
+                total_batches = (len(symbols) + self.batch_size - 1) // self.batch_size
+                logger.info(f"Processing batch {batch_num}/{total_batches} ({len(batch)} symbols)")
+
+                # vnstock calls are I/O-bound, so threads overlap network waits; the shared
+                # token bucket in _rate_limit() keeps the global request rate bounded.
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    futures = {
+                        executor.submit(self._collect_one, symbol, mode, start_date, end_date): symbol
+                        for symbol in batch
+                    }
+                    for future in as_completed(futures):
+                        symbol = futures[future]
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logger.error(f"Failed to collect {symbol}: {e}")
+                            failed_symbols.append(symbol)
+        finally:
+            self._queue.put(None)
+            writer.join()
+
+        total_records = self._written
+        failed_symbols.extend(self._write_failed)
         if failed_symbols:
             logger.warning(f"Failed symbols ({len(failed_symbols)}): {failed_symbols[:20]}")
 
         return total_records
 
-    def _collect_incremental(self, symbol: str, end_date: str) -> int:
+    def _collect_one(self, symbol: str, mode: str, start_date: date, end_date: date) -> int:
+        """Collect one symbol in the requested mode (runs on a worker thread)."""
+        if mode == "incremental":
+            return self._collect_incremental(symbol, end_date)
+        return self._collect_backfill(symbol, start_date, end_date)
+
+    def _collect_incremental(self, symbol: str, end_date: date) -> int:
         """Only fetch data from the last date in DB + 1 day to today."""
-        last_date = self._get_last_date(symbol)
+        last_date = self._last_dates.get(symbol)
 
         if last_date:
-            start = (last_date + timedelta(days=1)).strftime("%Y-%m-%d")
+            start = last_date + timedelta(days=1)
             if start > end_date:
                 logger.debug(f"{symbol}: already up-to-date (last={last_date})")
                 return 0
         else:
             # No data yet — backfill from default start
-            start = self.config.collection.default_start_date
+            start = self.default_start_date
 
         logger.info(f"{symbol}: incremental collect from {start} to {end_date}")
         return self._fetch_and_save(symbol, start, end_date)
 
-    def _collect_backfill(self, symbol: str, start_date: str, end_date: str) -> int:
+    def _collect_backfill(self, symbol: str, start_date: date, end_date: date) -> int:
         """Fetch full range of data."""
         logger.info(f"{symbol}: backfill from {start_date} to {end_date}")
         return self._fetch_and_save(symbol, start_date, end_date)
 
-    def _fetch_and_save(self, symbol: str, start_date: str, end_date: str) -> int:
+    def _fetch_and_save(self, symbol: str, start_date: date, end_date: date) -> int:
         """Fetch data from vnstock API and save to DB."""
         try:
-            stock = Vnstock().stock(symbol=symbol, source="VCI")
-            df = self._retry(
-                stock.quote.history,
-                start=start_date,
-                end=end_date,
-                interval="1D",
-            )
+            df = self._quote_history(symbol, start_date, end_date)
         except Exception as e:
             logger.error(f"API error for {symbol}: {e}")
             return 0
@@ -118,70 +164,66 @@ class PriceCollector(BaseCollector):
             logger.debug(f"{symbol}: no data returned for {start_date} to {end_date}")
             return 0
 
-        # Normalize column names
-        col_map = {
-            "time": "trading_date",
-            "date": "trading_date",
-            "TradingDate": "trading_date",
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Volume": "volume",
-            "open": "open",
-            "high": "high",
-            "low": "low",
-            "close": "close",
-            "volume": "volume",
-        }
-        df = df.rename(columns={k: v for k, v in col_map.items() if k in df.columns})
-
-        if "trading_date" not in df.columns:
-            logger.warning(f"{symbol}: 'trading_date' column not found. Columns: {list(df.columns)}")
+        df = normalize_ohlcv(df, "symbol", symbol)
+        if df is None:
+            logger.warning(f"{symbol}: 'trading_date' column not found in API response")
             return 0
 
-        # Ensure trading_date is proper date
-        df["trading_date"] = pd.to_datetime(df["trading_date"]).dt.date
-
-        # Insert with ON CONFLICT DO NOTHING
-        records = 0
-        engine = get_engine()
-        insert_sql = text("""
-            INSERT INTO daily_prices (symbol, trading_date, open, high, low, close, volume)
-            VALUES (:symbol, :trading_date, :open, :high, :low, :close, :volume)
-            ON CONFLICT (symbol, trading_date) DO NOTHING
-        """)
-
-        with engine.begin() as conn:
-            for _, row in df.iterrows():
-                try:
-                    conn.execute(
-                        insert_sql,
-                        {
-                            "symbol": symbol,
-                            "trading_date": row["trading_date"],
-                            "open": float(row.get("open", 0)) if pd.notna(row.get("open")) else None,
-                            "high": float(row.get("high", 0)) if pd.notna(row.get("high")) else None,
-                            "low": float(row.get("low", 0)) if pd.notna(row.get("low")) else None,
-                            "close": float(row.get("close", 0)) if pd.notna(row.get("close")) else None,
-                            "volume": int(row.get("volume", 0)) if pd.notna(row.get("volume")) else None,
-                        },
-                    )
-                    records += 1
-                except Exception as e:
-                    logger.debug(f"Insert error for {symbol} {row.get('trading_date')}: {e}")
-
-        return records
-
-    def _get_last_date(self, symbol: str) -> date | None:
-        """Get the most recent trading_date for a symbol in DB."""
+        # NaN/NA -> None column-wise; the writer thread bulk-loads them (upsert)
+        rows = ohlcv_rows(df)
+
+        if rows:
+            self._queue.put((symbol, rows))
+        return len(rows)
+
+    def _drain_queue(self) -> None:
+        """DB writer thread: buffer queued rows and bulk-load them every FLUSH_ROWS rows.
+
+        Runs until it receives the ``None`` sentinel, flushing whatever is left.
+        """
+        buffer: list[tuple] = []
+        symbols: list[str] = []
+        while True:
+            item = self._queue.get()
+            if item is not None:
+                symbol, rows = item
+                buffer.extend(rows)
+                symbols.append(symbol)
+                if len(buffer) < FLUSH_ROWS:
+                    continue
+            if buffer:
+                self._flush(buffer, symbols)
+                buffer, symbols = [], []
+            if item is None:
+                return
+
+    def _flush(self, rows: list[tuple], symbols: list[str]) -> None:
+        """Write buffered rows in one transaction; on error mark their symbols failed."""
+        # Large buffers go through COPY; small ones are cheaper as execute_values pages.
+        # Re-fetched bars overwrite the stored ones (upsert on symbol + date).
+        insert = self._copy_insert if len(rows) > COPY_THRESHOLD else self._bulk_insert
+        try:
+            with get_engine().begin() as conn:
+                self._written += insert(
+                    conn,
+                    "daily_prices",
+                    ("symbol", "trading_date", "open", "high", "low", "close", "volume"),
+                    rows,
+                    conflict=("symbol", "trading_date"),
+                    update=("open", "high", "low", "close", "volume"),
+                )
+        except Exception as e:
+            logger.error(f"Failed to save prices for {len(symbols)} symbols: {e}")
+            self._write_failed.extend(symbols)
+
+    def _get_last_dates(self) -> dict[str, date]:
+        """Get the most recent trading_date of every symbol in DB (one GROUP BY query)."""
         with get_session() as session:
-            result = (
-                session.query(func.max(DailyPrice.trading_date))
-                .filter(DailyPrice.symbol == symbol)
-                .scalar()
+            return dict(
+                session.query(DailyPrice.symbol, func.max(DailyPrice.trading_date))
+                .group_by(DailyPrice.symbol)
+                .all()
             )
-            return result
 
     def _get_all_symbols(self) -> list[str]:
         """Get all active symbols from the stock_listings table."""
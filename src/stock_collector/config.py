@@ -2,6 +2,7 @@
 
 import os
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -9,7 +10,7 @@ import yaml
 from dotenv import load_dotenv
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DBConfig:
     host: str = "localhost"
     port: int = 5432
@@ -18,6 +19,9 @@ class DBConfig:
     password: str = ""
     host_ipv4: str = ""  # Optional IPv4 override for Docker IPv6 issues
     pooler_url: str = ""  # Full pooler connection string (from Supabase dashboard)
+    pool_size: int = 20  # Persistent connections (never below collection.workers)
+    max_overflow: int = 30  # Extra connections allowed under burst load
+    pool_timeout: int = 30  # Seconds to wait for a free connection
 
     @property
     def url(self) -> str:
@@ -28,7 +32,7 @@ class DBConfig:
         return f"postgresql://{self.user}:{pwd}@{conn_host}:{self.port}/{self.name}"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CollectionConfig:
     default_start_date: str = "2012-01-01"
     batch_size: int = 50
@@ -36,16 +40,20 @@ class CollectionConfig:
     max_retries: int = 3
     retry_delay: float = 5.0
     rate_limit_delay: float = 60.0
+    workers: int = 8
+    cache_dir: str = ".cache/financial"
+    cache_ttl: int = 86400
+    store_raw: bool = False
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LoggingConfig:
     level: str = "INFO"
     format: str = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
     file: str = "logs/stock_collector.log"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AppConfig:
     db: DBConfig = field(default_factory=DBConfig)
     collection: CollectionConfig = field(default_factory=CollectionConfig)
@@ -62,8 +70,9 @@ def _find_project_root() -> Path:
     return current
 
 
+@lru_cache(maxsize=1)
 def load_config() -> AppConfig:
-    """Load configuration from .env and config.yaml."""
+    """Load configuration from .env and config.yaml (parsed once per process)."""
     project_root = _find_project_root()
 
     # Load .env file
@@ -86,6 +95,9 @@ def load_config() -> AppConfig:
         password=os.getenv("DB_PASSWORD", ""),
         host_ipv4=os.getenv("DB_HOST_IPV4", ""),
         pooler_url=os.getenv("DB_POOLER_URL", ""),  # Supabase pooler connection string
+        pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "30")),
+        pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
     )
 
     # Build collection config
@@ -97,6 +109,10 @@ def load_config() -> AppConfig:
         max_retries=coll_data.get("max_retries", 3),
         retry_delay=coll_data.get("retry_delay", 5.0),
         rate_limit_delay=coll_data.get("rate_limit_delay", 60.0),
+        workers=coll_data.get("workers", 8),
+        cache_dir=coll_data.get("cache_dir", ".cache/financial"),
+        cache_ttl=coll_data.get("cache_ttl", 86400),
+        store_raw=coll_data.get("store_raw", False),
     )
 
     # Set VNSTOCK_API_KEY so vnstock picks it up automatically
@@ -4,7 +4,7 @@ This module manages database connections for PostgreSQL. It includes:
 - Thread-safe engine initialization with idempotent behavior
 - Auto-detection of Supabase direct hosts and fallback to Connection Pooler
 - IPv4 connection preference to avoid IPv6-only environments (GitHub Actions, Docker)
-- Connection pooling with automatic health checks (pool_pre_ping)
+- LIFO connection pooling with TCP keepalives; idle connections pinged on checkout
 - Exponential backoff retry logic for transient connection errors
 - Automatic cleanup on application exit
 - Connection timeout (10s) and statement timeout (5 min)
@@ -19,46 +19,99 @@ Supabase IPv6 Issue:
 import atexit
 import logging
 import os
+import random
 import re
 import socket
 import threading
 import time
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import Generator, Optional
-from urllib.parse import quote_plus
+from urllib.parse import urlparse
 
-from sqlalchemy import create_engine, event, text
-from sqlalchemy.engine import Engine
-from sqlalchemy.orm import Session, sessionmaker
+import orjson
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 
 from stock_collector.config import AppConfig
 
+__all__ = [
+    "init_engine",
+    "get_engine",
+    "dispose_engine",
+    "get_session",
+    "create_all_tables",
+    "test_connection",
+]
+
 logger = logging.getLogger(__name__)
 
-_engine: Optional[Engine] = None
-_SessionLocal: Optional[sessionmaker] = None
-_lock = threading.Lock()
+# (engine, thread-local session registry), published together with one assignment so readers
+# that snapshot it into a local never see a half-initialized or torn pair
+_state: Optional[tuple[Engine, scoped_session]] = None
+_lock = threading.RLock()  # re-entrant: init_engine may be reached from engine event hooks
+_atexit_registered = False
+_tables_created = False  # create_all_tables already ran against the current engine
+
+# IPv4 lookups are cached per _DNS_TTL-second time bucket
+_DNS_TTL = 60
+
+# Pooled connections idle longer than this are pinged on checkout
+_IDLE_PING_SECONDS = 60
+
+# Connection errors no retry can fix: bad credentials, unknown role/database.
+# psycopg2 raises these at connect time as OperationalError without a pgcode,
+# so the message is matched as well as the error class.
+_UNRECOVERABLE_ERR_RE = re.compile(
+    r"password authentication failed|role \".*\" does not exist"
+    r"|database \".*\" does not exist|no pg_hba\.conf entry",
+    re.IGNORECASE,
+)
+
+# Supabase direct connection host: db.<project-ref>.supabase.co
+_SUPABASE_DIRECT_RE = re.compile(r"^db\.([a-z0-9]+)\.supabase\.co$")
+
+# Connection errors worth a pool reset + retry in get_session ("2406:" = IPv6 address)
+_IPV6_ERR_RE = re.compile(
+    r"2406:|network is unreachable|no route to host|connection refused|timeout", re.IGNORECASE
+)
 
 
 def _resolve_ipv4(hostname: str, port: int) -> Optional[str]:
-    """Try to resolve hostname to an IPv4 address. Returns None if not found."""
-    try:
-        # Strategy 1: AF_INET only
-        addr_info = socket.getaddrinfo(hostname, port, family=socket.AF_INET)
-        if addr_info:
-            return str(addr_info[0][4][0])
-    except socket.gaierror:
-        pass
+    """Try to resolve hostname to an IPv4 address. Returns None if not found.
+
+    Results (including failures) are reused until the current _DNS_TTL window ends.
+    """
+    return _cached_ipv4(hostname, port, int(time.monotonic() // _DNS_TTL))
+
 
+@lru_cache(maxsize=32)
+def _cached_ipv4(hostname: str, port: int, bucket: int) -> Optional[str]:
+    # bucket only varies the cache key; a new window forces a fresh lookup
+    return _lookup_ipv4(hostname, port)
+
+
+def _lookup_ipv4(hostname: str, port: int) -> Optional[str]:
+    """Uncached IPv4 lookup used by _resolve_ipv4.
+
+    One AF_UNSPEC query returns A and AAAA records together; the first IPv4
+    address wins.
+    """
     try:
-        # Strategy 2: AF_UNSPEC, filter for IPv4
-        addr_info = socket.getaddrinfo(hostname, port, family=socket.AF_UNSPEC)
-        ipv4_results = [a for a in addr_info if a[0] == socket.AF_INET]
-        if ipv4_results:
-            return str(ipv4_results[0][4][0])
+        addr_info = socket.getaddrinfo(
+            hostname,
+            port,
+            family=socket.AF_UNSPEC,
+            type=socket.SOCK_STREAM,
+            flags=socket.AI_ADDRCONFIG,
+        )
     except socket.gaierror:
-        pass
+        return None
 
+    for family, _, _, _, sockaddr in addr_info:
+        if family == socket.AF_INET:
+            return str(sockaddr[0])
     return None
 
 
@@ -75,10 +128,10 @@ def _detect_supabase_region(project_ref: str) -> str:
             for header_name in ("sb-region", "x-region", "fly-region"):
                 val = resp.headers.get(header_name, "")
                 if val:
-                    logger.info(f"  Detected Supabase region: {val}")
+                    logger.info("  Detected Supabase region: %s", val)
                     return val.strip()
     except Exception as e:
-        logger.debug(f"  Could not auto-detect Supabase region: {e}")
+        logger.debug("  Could not auto-detect Supabase region: %s", e)
 
     # Default for Vietnamese users (Singapore — closest region)
     return "ap-southeast-1"
@@ -90,7 +143,7 @@ def _get_supabase_pooler(host: str, user: str) -> Optional[tuple[str, int, str]]
     return (pooler_host, pooler_port, pooler_user) for session mode.
     Returns None if not a Supabase direct host.
     """
-    match = re.match(r"^db\.([a-z0-9]+)\.supabase\.co$", host)
+    match = _SUPABASE_DIRECT_RE.match(host)
     if not match:
         return None
 
@@ -108,6 +161,168 @@ def _get_supabase_pooler(host: str, user: str) -> Optional[tuple[str, int, str]]
     return (pooler_host, pooler_port, pooler_user)
 
 
+def _with_psycopg2_driver(db_url: str) -> URL:
+    """Pin the psycopg2 driver for bare ``postgresql://``/``postgres://`` URLs.
+
+    The bulk load paths use psycopg2's ``execute_values``/``copy_expert``, and
+    SQLAlchemy 2.1 maps a bare ``postgresql://`` to psycopg 3 instead.
+    """
+    url = make_url(db_url)
+    if url.drivername in ("postgres", "postgresql"):
+        url = url.set(drivername="postgresql+psycopg2")
+    return url
+
+
+def _json_dumps(value) -> str:
+    """JSON/JSONB bind serializer (orjson; numpy scalars and non-str keys allowed)."""
+    return orjson.dumps(
+        value, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ).decode("utf-8")
+
+
+def _build_engine(config: AppConfig) -> Engine:
+    """Create a configured engine for ``config`` (no global state touched)."""
+    db_url = config.db.url
+    ipv4_addr = None
+    effective_host = config.db.host
+    effective_port = config.db.port
+
+    # --- Priority 1: Use DB_POOLER_URL if set (Supabase pooler) ---
+    if config.db.pooler_url:
+        db_url = config.db.pooler_url
+        logger.info("🔄 Using DB_POOLER_URL (Supabase pooler connection)")
+
+        # Try to extract host from pooler URL for IPv4 resolution
+        try:
+            parsed = urlparse(db_url)
+            if parsed.hostname:
+                effective_host = parsed.hostname
+                effective_port = parsed.port or 6543
+                ipv4_addr = _resolve_ipv4(effective_host, effective_port)
+                if ipv4_addr:
+                    logger.info("  ✓ Pooler resolved to IPv4: %s", ipv4_addr)
+        except Exception:
+            pass
+
+    # --- Priority 2: Standard host with IPv4 resolution ---
+    elif config.db.host not in ("localhost", "127.0.0.1", "::1"):
+        ipv4_addr = _resolve_ipv4(config.db.host, config.db.port)
+        if ipv4_addr:
+            logger.info("✓ Resolved %s to IPv4: %s", config.db.host, ipv4_addr)
+        else:
+            logger.warning(
+                "⚠ No IPv4 for %s — connection may fail.\n"
+                "  Set DB_POOLER_URL env var with your Supabase pooler "
+                "connection string (Dashboard → Settings → Database → Session mode)",
+                config.db.host,
+            )
+    else:
+        logger.debug("Skipping DNS resolution for %s", config.db.host)
+
+    # --- Build connect_args ---
+    connect_args = {
+        "connect_timeout": 10,
+        "options": "-c statement_timeout=300000",  # 5 min
+        "application_name": "stock_collector",
+        "tcp_user_timeout": 10000,
+        # Kernel-level liveness checks replace a SELECT 1 on every checkout
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
+    }
+
+    if ipv4_addr:
+        # hostaddr is the connect target; host stays the name for TLS/SNI
+        # and pooler routing, so the URL itself is never rewritten
+        connect_args["hostaddr"] = ipv4_addr
+        connect_args["host"] = effective_host
+        logger.debug("Using hostaddr=%s to enforce IPv4", ipv4_addr)
+
+    # --- Create engine ---
+    # Size the pool to at least the collector worker count so each thread gets a connection
+    engine = create_engine(
+        _with_psycopg2_driver(db_url),
+        pool_size=max(config.db.pool_size, config.collection.workers, 1),
+        max_overflow=config.db.max_overflow,
+        pool_timeout=config.db.pool_timeout,
+        pool_recycle=300,
+        # No per-checkout SELECT 1: _ping_if_idle only pings connections idle > 60s
+        pool_pre_ping=False,
+        # Reuse the most recently returned connection: warm backend caches,
+        # and surplus connections sit idle until recycled
+        pool_use_lifo=True,
+        # executemany: insert() constructs become multi-row VALUES pages
+        # (insertmanyvalues); text() INSERT/UPDATE use psycopg2 execute_batch
+        executemany_mode="values_plus_batch",
+        insertmanyvalues_page_size=1000,
+        executemany_batch_page_size=500,
+        # JSONB raw_data both ways via orjson; the psycopg2 dialect registers
+        # json_deserializer as the connection's json/jsonb typecaster
+        json_serializer=_json_dumps,
+        json_deserializer=orjson.loads,
+        connect_args=connect_args,
+        echo=False,
+        future=True,
+    )
+
+    event.listen(engine, "connect", _stamp_last_used)
+    event.listen(engine, "checkin", _stamp_last_used)
+    event.listen(engine, "checkout", _ping_if_idle)
+
+    @event.listens_for(engine, "engine_disposed")
+    def receive_engine_disposed(engine):
+        logger.debug("Engine connection pool disposed")
+
+    logger.info(
+        "Database engine initialized: %s:%s/%s",
+        effective_host,
+        effective_port,
+        config.db.name,
+    )
+    return engine
+
+
+def _stamp_last_used(dbapi_connection, connection_record) -> None:
+    """Pool connect/checkin hook: remember when the connection was last in use."""
+    connection_record.info["last_used"] = time.monotonic()
+
+
+def _ping_if_idle(dbapi_connection, connection_record, connection_proxy) -> None:
+    """
+    Pool checkout hook: ping only connections idle longer than _IDLE_PING_SECONDS.
+
+    Raising DisconnectionError makes the pool discard this connection and
+    retry the checkout with a fresh one.
+    """
+    idle = time.monotonic() - connection_record.info.get("last_used", 0.0)
+    if idle <= _IDLE_PING_SECONDS:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+    except Exception as e:
+        logger.debug("Stale pooled connection after %.0fs idle: %s", idle, e)
+        raise exc.DisconnectionError() from e
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+    connection_record.info["last_used"] = time.monotonic()
+
+
+def _build_session_factory(engine: Engine) -> scoped_session:
+    """Thread-local session registry bound to ``engine``, with write tracking for get_session."""
+    # expire_on_commit=False: loaded objects stay usable after commit/close
+    # without a reload SELECT (no call site depends on post-commit refresh)
+    factory = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+    event.listen(factory, "after_flush", _mark_flush_write)
+    event.listen(factory, "do_orm_execute", _mark_execute_write)
+    # One Session object per thread, reused across get_session() blocks
+    return scoped_session(factory)
+
+
 def init_engine(config: AppConfig) -> None:
     """
     Initialize the SQLAlchemy engine and session factory.
@@ -117,101 +332,34 @@ def init_engine(config: AppConfig) -> None:
     - Auto Supabase pooler fallback when IPv4 is unavailable
     - Connection timeout (10 seconds)
     - Pool recycle for long-lived connections
-    - Pre-ping to detect stale connections
+    - TCP keepalives plus an idle-only ping on checkout to detect dead connections
     """
-    global _engine, _SessionLocal
+    global _state, _atexit_registered
 
-    if _engine is not None:
+    # Fast path: one global read into a local
+    state = _state
+    if state is not None:
         logger.debug("Database engine already initialized, skipping re-initialization")
         return
 
     with _lock:
         # Double-check after acquiring lock
-        if _engine is not None:
+        state = _state
+        if state is not None:
             return
 
         try:
-            db_url = config.db.url
-            ipv4_addr = None
-            effective_host = config.db.host
-            effective_port = config.db.port
-
-            # --- Priority 1: Use DB_POOLER_URL if set (Supabase pooler) ---
-            if config.db.pooler_url:
-                db_url = config.db.pooler_url
-                logger.info("🔄 Using DB_POOLER_URL (Supabase pooler connection)")
-
-                # Try to extract host from pooler URL for IPv4 resolution
-                try:
-                    from urllib.parse import urlparse
-                    parsed = urlparse(db_url)
-                    if parsed.hostname:
-                        effective_host = parsed.hostname
-                        effective_port = parsed.port or 6543
-                        ipv4_addr = _resolve_ipv4(effective_host, effective_port)
-                        if ipv4_addr:
-                            logger.info(f"  ✓ Pooler resolved to IPv4: {ipv4_addr}")
-                except Exception:
-                    pass
-
-            # --- Priority 2: Standard host with IPv4 resolution ---
-            elif config.db.host not in ("localhost", "127.0.0.1", "::1"):
-                ipv4_addr = _resolve_ipv4(config.db.host, config.db.port)
-                if ipv4_addr:
-                    logger.info(f"✓ Resolved {config.db.host} to IPv4: {ipv4_addr}")
-                    db_url = db_url.replace(config.db.host, ipv4_addr)
-                else:
-                    logger.warning(
-                        f"⚠ No IPv4 for {config.db.host} — connection may fail.\n"
-                        f"  Set DB_POOLER_URL env var with your Supabase pooler "
-                        f"connection string (Dashboard → Settings → Database → Session mode)"
-                    )
-            else:
-                logger.debug(f"Skipping DNS resolution for {config.db.host}")
-
-            # --- Build connect_args ---
-            connect_args = {
-                "connect_timeout": 10,
-                "options": "-c statement_timeout=300000",  # 5 min
-                "application_name": "stock_collector",
-                "tcp_user_timeout": 10000,
-            }
-
-            if ipv4_addr:
-                connect_args["hostaddr"] = ipv4_addr
-                logger.debug(f"Using hostaddr={ipv4_addr} to enforce IPv4")
-
-            # --- Create engine ---
-            _engine = create_engine(
-                db_url,
-                pool_size=5,
-                max_overflow=10,
-                pool_recycle=3600,
-                pool_pre_ping=True,
-                connect_args=connect_args,
-                echo=False,
-                future=True,
-            )
-
-            @event.listens_for(_engine, "engine_disposed")
-            def receive_engine_disposed(engine):
-                logger.debug("Engine connection pool disposed")
-
-            _SessionLocal = sessionmaker(bind=_engine, autoflush=False, autocommit=False)
-
-            atexit.register(dispose_engine)
-
-            logger.info(
-                f"Database engine initialized: "
-                f"{effective_host}:{effective_port}/{config.db.name}"
-            )
-
+            engine = _build_engine(config)
         except Exception as e:
-            logger.error(f"Failed to initialize database engine: {e}", exc_info=True)
-            _engine = None
+            logger.error("Failed to initialize database engine: %s", e, exc_info=True)
             raise
 
+        _state = (engine, _build_session_factory(engine))
 
+    # Outside the lock; once per process even across dispose/init cycles
+    if not _atexit_registered:
+        _atexit_registered = True
+        atexit.register(dispose_engine)
 
 
 def get_engine() -> Engine:
@@ -224,40 +372,80 @@ def get_engine() -> Engine:
     Raises:
         RuntimeError: If engine is not initialized
     """
-    if _engine is None:
+    state = _state
+    if state is None:
         raise RuntimeError("Database engine not initialized. Call init_engine() first.")
-    return _engine
+    return state[0]
+
+
+def _decorrelated_jitter(
+    prev_wait: float, factor: float = 3.0, base: float = 1.0, cap: float = 30.0
+) -> float:
+    """Next retry delay: uniform in [base, prev_wait * factor], capped.
+
+    Randomized (decorrelated) backoff keeps clients that failed together from
+    reconnecting in lockstep.
+    """
+    return min(cap, random.uniform(base, max(base, prev_wait) * factor))
+
+
+def _is_unrecoverable(error: Exception) -> bool:
+    """True for auth/catalog errors that retrying cannot fix."""
+    from psycopg2 import errors as pg_errors
+
+    orig = getattr(error, "orig", error)
+    if isinstance(
+        orig,
+        (
+            pg_errors.InvalidPassword,
+            pg_errors.InvalidAuthorizationSpecification,
+            pg_errors.InvalidCatalogName,
+        ),
+    ):
+        return True
+    return bool(_UNRECOVERABLE_ERR_RE.search(str(orig)))
 
 
 def _test_connection_with_retry(max_retries: int = 3, backoff_factor: float = 2.0) -> bool:
     """
-    Test database connection with exponential backoff retry.
+    Test database connection, retrying with decorrelated-jitter backoff.
+
+    Each wait is drawn uniformly between 1s and ``backoff_factor`` times the
+    previous wait, capped at 30s (see _decorrelated_jitter). Authentication and
+    unknown-database errors fail immediately.
     
     Args:
         max_retries: Maximum number of retry attempts
-        backoff_factor: Exponential backoff multiplier
+        backoff_factor: Growth factor of the jittered backoff window
         
     Returns:
         bool: True if connection successful, False otherwise
     """
     engine = get_engine()
-    
+    wait_time = 0.0
+
     for attempt in range(max_retries):
         try:
             with engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
-            logger.debug(f"Database connection test successful on attempt {attempt + 1}")
+                # Straight to the DBAPI cursor: no text() construct or SQL compilation
+                conn.exec_driver_sql("SELECT 1")
+            logger.debug("Database connection test successful on attempt %d", attempt + 1)
             return True
         except Exception as e:
+            if _is_unrecoverable(e):
+                logger.error("Connection failed (not retrying): %s", e)
+                return False
             if attempt < max_retries - 1:
-                wait_time = backoff_factor ** attempt
+                wait_time = _decorrelated_jitter(wait_time, factor=backoff_factor)
                 logger.warning(
-                    f"Connection attempt {attempt + 1} failed: {e}. "
-                    f"Retrying in {wait_time}s..."
+                    "Connection attempt %d failed: %s. Retrying in %.1fs...",
+                    attempt + 1,
+                    e,
+                    wait_time,
                 )
                 time.sleep(wait_time)
             else:
-                logger.error(f"Connection failed after {max_retries} attempts: {e}")
+                logger.error("Connection failed after %d attempts: %s", max_retries, e)
                 return False
     
     return False
@@ -265,15 +453,36 @@ def _test_connection_with_retry(max_retries: int = 3, backoff_factor: float = 2.
 
 def dispose_engine() -> None:
     """Dispose of the engine and clean up connections."""
-    global _engine
-    if _engine is not None:
+    global _state, _tables_created
+    # Manual disposal should also pick up DNS changes on the next init
+    _cached_ipv4.cache_clear()
+    state = _state
+    if state is not None:
+        # Unpublish first so new get_session() calls fail fast instead of using it
+        _state = None
+        _tables_created = False
         try:
-            _engine.dispose()
+            state[0].dispose()
             logger.info("Database engine disposed successfully")
         except Exception as e:
-            logger.error(f"Error disposing database engine: {e}", exc_info=True)
-        finally:
-            _engine = None
+            logger.error("Error disposing database engine: %s", e, exc_info=True)
+
+
+def _mark_flush_write(session: Session, flush_context) -> None:
+    session.info["has_writes"] = True
+
+
+def _mark_execute_write(orm_execute_state) -> None:
+    # Anything that is not a SELECT (ORM DML, bulk ops, text()) counts as a write
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+def _has_writes(session: Session) -> bool:
+    """True if the session flushed/executed DML or still holds pending ORM changes."""
+    return bool(
+        session.info.get("has_writes") or session.new or session.dirty or session.deleted
+    )
 
 
 @contextmanager
@@ -285,8 +494,11 @@ def get_session() -> Generator[Session, None, None]:
     errors are detected. If a connection fails due to IPv6 being unreachable:
     1. Detects IPv6-related errors (pattern matching)
     2. Disposes connection pool to force fresh connection
-    3. Retries with exponential backoff (1s, 2s, 4s)
+    3. Retries with jittered (decorrelated) backoff, capped at 30s
     4. Gradually increases timeouts to help recovery
+
+    Each thread reuses one Session object across blocks (scoped_session);
+    a nested block in the same thread gets a separate session.
     
     Usage:
         with get_session() as session:
@@ -299,91 +511,110 @@ def get_session() -> Generator[Session, None, None]:
         RuntimeError: If engine is not initialized
         sqlalchemy.exc.OperationalError: If all retries exhausted
     """
-    if _SessionLocal is None:
+    state = _state
+    if state is None:
         raise RuntimeError("Database engine not initialized. Call init_engine() first.")
-    
+    engine, sessions = state
+
+    # Reuse this thread's session unless an outer get_session() block holds it;
+    # nested blocks get their own session so inner commit/close can't touch the outer one
+    session = sessions()
+    if session.info.get("in_use"):
+        session = sessions.session_factory()
+    else:
+        session.info["in_use"] = True
+
     max_retries = 4
     retry_count = 0
+    wait_time = 0.0
     ipv6_error_detected = False
     
-    while retry_count <= max_retries:
-        session = _SessionLocal()
-        try:
-            yield session
-            session.commit()
-            if retry_count > 0:
-                logger.info(f"✓ Connection recovered after {retry_count} retries")
-            return
-            
-        except Exception as e:
-            session.rollback()
-            
-            # Detect IPv6-related connection errors
-            error_str = str(e).lower()
-            error_full = str(e)
+    try:
+        while retry_count <= max_retries:
+            try:
+                yield session
+                # Read-only sessions skip the COMMIT round-trip; close() releases them
+                if _has_writes(session):
+                    session.commit()
+                if retry_count > 0:
+                    logger.info("✓ Connection recovered after %d retries", retry_count)
+                return
             
-            is_ipv6_error = (
-                "2406:" in error_full  # IPv6 address pattern
-                or "network is unreachable" in error_str
-                or "no route to host" in error_str
-                or "connection refused" in error_str and retry_count < max_retries
-                or "timeout" in error_str and retry_count < max_retries
-            )
+            except Exception as e:
+                session.rollback()
             
-            if is_ipv6_error and retry_count < max_retries:
-                ipv6_error_detected = True
-                retry_count += 1
-                wait_time = 2 ** (retry_count - 1)  # 1s, 2s, 4s, 8s
+                # Detect IPv6-related connection errors
+                error_str = str(e)
+                is_ipv6_error = _IPV6_ERR_RE.search(error_str) is not None
+
+                if is_ipv6_error and retry_count < max_retries:
+                    ipv6_error_detected = True
+                    retry_count += 1
+                    wait_time = _decorrelated_jitter(wait_time)
                 
-                logger.warning(
-                    f"🔄 Connection error detected (attempt {retry_count}/{max_retries}): "
-                    f"{error_str[:80]}... Retrying in {wait_time}s..."
-                )
+                    logger.warning(
+                        "🔄 Connection error detected (attempt %d/%d): %.80s... Retrying in %.1fs...",
+                        retry_count,
+                        max_retries,
+                        error_str,
+                        wait_time,
+                    )
                 
-                # Dispose pool to force new connection with fresh DNS resolution
-                engine = get_engine()
-                engine.dispose()
-                logger.debug(f"  → Disposed connection pool")
+                    # Dispose pool to force new connection with fresh DNS resolution
+                    engine.dispose()
+                    logger.debug("  → Disposed connection pool")
                 
-                time.sleep(wait_time)
-                continue
-            else:
-                # Not a retriable error or max retries exceeded
-                if ipv6_error_detected:
-                    logger.error(
-                        f"✗ Connection failed after {retry_count} retries. "
-                        f"Last error: {error_str[:100]}",
-                        exc_info=True
-                    )
+                    time.sleep(wait_time)
+                    continue
                 else:
-                    logger.error(f"✗ Session error (non-retriable): {error_str[:100]}", exc_info=True)
-                raise
+                    # Not a retriable error or max retries exceeded
+                    if ipv6_error_detected:
+                        logger.error(
+                            "✗ Connection failed after %d retries. Last error: %.100s",
+                            retry_count,
+                            error_str,
+                            exc_info=True
+                        )
+                    else:
+                        logger.error("✗ Session error (non-retriable): %.100s", error_str, exc_info=True)
+                    raise
                 
-        finally:
-            session.close()
-
-
+            finally:
+                # close() keeps the Session object for reuse; its info dict survives, so reset it
+                session.info.pop("has_writes", None)
+                session.close()
+    finally:
+        session.info.pop("in_use", None)
 
 
 def create_all_tables() -> None:
     """
     Create all tables defined in the ORM models.
     
-    This is idempotent - it only creates tables that don't exist.
+    This is idempotent - it only creates tables that don't exist, then applies
+    the in-place upgrades in ``stock_collector.db.upgrades``. Repeat calls for the
+    same engine return without inspecting the schema again.
     
     Raises:
         RuntimeError: If engine is not initialized
     """
+    global _tables_created
+    if _tables_created:
+        logger.debug("Tables already created for this engine, skipping")
+        return
     try:
         from stock_collector.db.models import Base
+        from stock_collector.db.upgrades import run_schema_upgrades
         engine = get_engine()
         Base.metadata.create_all(engine)
+        run_schema_upgrades(engine)
+        _tables_created = True
         logger.info("All database tables created successfully")
     except RuntimeError as e:
-        logger.error(f"Cannot create tables: {e}")
+        logger.error("Cannot create tables: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Error creating tables: {e}", exc_info=True)
+        logger.error("Error creating tables: %s", e, exc_info=True)
         raise
 
 
@@ -397,5 +628,5 @@ def test_connection() -> bool:
     try:
         return _test_connection_with_retry(max_retries=3, backoff_factor=2.0)
     except RuntimeError as e:
-        logger.error(f"Database not initialized: {e}")
+        logger.error("Database not initialized: %s", e)
         return False
@@ -1,23 +1,27 @@
 """SQLAlchemy ORM models for Vietnamese stock market data."""
 
-from datetime import date, datetime
-
 from sqlalchemy import (
     BigInteger,
     Column,
     Date,
     DateTime,
+    Double,
     Index,
     Integer,
     Numeric,
     String,
     Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase
 
 
+# Naive UTC timestamp evaluated by the server (columns are timezone-less DateTime)
+_UTC_NOW = text("timezone('utc', now())")
+
+
 class Base(DeclarativeBase):
     """Base class for all ORM models."""
     pass
@@ -35,9 +39,9 @@ class StockListing(Base):
     industry = Column(String(500), nullable=True, comment="Ngành")
     status = Column(String(20), default="listed", comment="Trạng thái: listed/delisted")
     first_listed_date = Column(Date, nullable=True, comment="Ngày niêm yết đầu tiên")
-    created_at = Column(DateTime, default=datetime.utcnow, comment="Ngày tạo bản ghi")
+    created_at = Column(DateTime, server_default=_UTC_NOW, comment="Ngày tạo bản ghi")
     updated_at = Column(
-        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment="Ngày cập nhật"
+        DateTime, server_default=_UTC_NOW, onupdate=_UTC_NOW, comment="Ngày cập nhật"
     )
 
     def __repr__(self):
@@ -49,19 +53,23 @@ class DailyPrice(Base):
 
     __tablename__ = "daily_prices"
 
+    # Partitioned by trading_date, so the partition key must be part of the PK
     id = Column(BigInteger, primary_key=True, autoincrement=True)
-    symbol = Column(String(20), nullable=False, index=True, comment="Mã CK")
-    trading_date = Column(Date, nullable=False, comment="Ngày giao dịch")
-    open = Column(Numeric(15, 2), nullable=True, comment="Giá mở cửa")
-    high = Column(Numeric(15, 2), nullable=True, comment="Giá cao nhất")
-    low = Column(Numeric(15, 2), nullable=True, comment="Giá thấp nhất")
-    close = Column(Numeric(15, 2), nullable=True, comment="Giá đóng cửa")
+    symbol = Column(String(20), nullable=False, comment="Mã CK")
+    trading_date = Column(Date, primary_key=True, nullable=False, comment="Ngày giao dịch")
+    open = Column(Double, nullable=True, comment="Giá mở cửa")
+    high = Column(Double, nullable=True, comment="Giá cao nhất")
+    low = Column(Double, nullable=True, comment="Giá thấp nhất")
+    close = Column(Double, nullable=True, comment="Giá đóng cửa")
     volume = Column(BigInteger, nullable=True, comment="Khối lượng giao dịch")
 
     __table_args__ = (
         UniqueConstraint("symbol", "trading_date", name="uq_daily_prices_symbol_date"),
+        # B-tree, not BRIN: the status summary's max(trading_date) needs ordered access
         Index("ix_daily_prices_trading_date", "trading_date"),
         Index("ix_daily_prices_symbol_date_desc", "symbol", trading_date.desc()),
+        # Yearly partitions are created by stock_collector.db.upgrades
+        {"postgresql_partition_by": "RANGE (trading_date)"},
     )
 
     def __repr__(self):
@@ -74,7 +82,7 @@ class FinancialIncomeStatement(Base):
     __tablename__ = "financial_income_statements"
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
-    symbol = Column(String(20), nullable=False, index=True, comment="Mã CK")
+    symbol = Column(String(20), nullable=False, comment="Mã CK")
     period = Column(String(10), nullable=False, comment="year/quarter")
     year = Column(Integer, nullable=False, comment="Năm")
     quarter = Column(Integer, nullable=True, comment="Quý (null cho annual)")
@@ -101,7 +109,7 @@ class FinancialBalanceSheet(Base):
     __tablename__ = "financial_balance_sheets"
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
-    symbol = Column(String(20), nullable=False, index=True, comment="Mã CK")
+    symbol = Column(String(20), nullable=False, comment="Mã CK")
     period = Column(String(10), nullable=False, comment="year/quarter")
     year = Column(Integer, nullable=False, comment="Năm")
     quarter = Column(Integer, nullable=True, comment="Quý (null cho annual)")
@@ -127,15 +135,16 @@ class MarketIndex(Base):
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     index_name = Column(String(30), nullable=False, comment="Tên chỉ số")
     trading_date = Column(Date, nullable=False, comment="Ngày giao dịch")
-    open = Column(Numeric(15, 2), nullable=True, comment="Giá mở cửa")
-    high = Column(Numeric(15, 2), nullable=True, comment="Giá cao nhất")
-    low = Column(Numeric(15, 2), nullable=True, comment="Giá thấp nhất")
-    close = Column(Numeric(15, 2), nullable=True, comment="Giá đóng cửa")
+    open = Column(Double, nullable=True, comment="Giá mở cửa")
+    high = Column(Double, nullable=True, comment="Giá cao nhất")
+    low = Column(Double, nullable=True, comment="Giá thấp nhất")
+    close = Column(Double, nullable=True, comment="Giá đóng cửa")
     volume = Column(BigInteger, nullable=True, comment="Khối lượng")
 
     __table_args__ = (
+        # The unique constraint's index also serves (index_name, trading_date) lookups
         UniqueConstraint("index_name", "trading_date", name="uq_market_index_date"),
-        Index("ix_market_index_name_date", "index_name", "trading_date"),
+        Index("ix_market_index_trading_date", "trading_date"),
     )
 
     def __repr__(self):
@@ -154,12 +163,13 @@ class CollectionLog(Base):
     symbol = Column(String(20), nullable=True, comment="Mã CK (null cho listing/index)")
     status = Column(String(20), nullable=False, default="running", comment="running/success/failed")
     records_count = Column(Integer, nullable=True, default=0, comment="Số bản ghi thu thập")
-    started_at = Column(DateTime, nullable=False, default=datetime.utcnow, comment="Thời gian bắt đầu")
+    started_at = Column(DateTime, nullable=False, server_default=_UTC_NOW, comment="Thời gian bắt đầu")
     finished_at = Column(DateTime, nullable=True, comment="Thời gian kết thúc")
     error_message = Column(Text, nullable=True, comment="Thông báo lỗi nếu failed")
 
     __table_args__ = (
         Index("ix_collection_logs_type_status", "collection_type", "status"),
+        # Serves ORDER BY started_at DESC LIMIT n in the status command
         Index("ix_collection_logs_started", "started_at"),
     )
 
@@ -0,0 +1,156 @@
+"""In-place schema upgrades for databases created by older versions.
+
+``Base.metadata.create_all`` only creates missing tables; it never alters
+existing ones. Each statement here is idempotent and is applied by
+``create_all_tables`` right after ``create_all``.
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# OHLC columns: numeric(15,2) -> double precision (8 bytes, hardware arithmetic)
+_PRICE_COLUMNS_TO_DOUBLE = """
+DO $$
+DECLARE
+    col record;
+BEGIN
+    FOR col IN
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = '{table}'
+          AND column_name IN ('open', 'high', 'low', 'close')
+          AND data_type = 'numeric'
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE %I ALTER COLUMN %I TYPE double precision',
+            col.table_name, col.column_name
+        );
+    END LOOP;
+END $$;
+"""
+
+# daily_prices partitions: one per year from _FIRST_PARTITION_YEAR to next year,
+# plus a DEFAULT catch-all. Skipped when daily_prices predates partitioning.
+# A year whose rows already landed in DEFAULT (init-db not re-run in time) is
+# split out: DEFAULT is detached, the year partition created, its rows moved
+# over, and DEFAULT re-attached — all in this block's single transaction.
+_FIRST_PARTITION_YEAR = 2000
+_DAILY_PRICE_PARTITIONS = f"""
+DO $$
+DECLARE
+    y int;
+    part text;
+    lo date;
+    hi date;
+    has_default boolean := to_regclass('daily_prices_default') IS NOT NULL;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('daily_prices')
+    ) THEN
+        RAISE NOTICE 'daily_prices is not partitioned; skipping partition creation';
+        RETURN;
+    END IF;
+    FOR y IN {_FIRST_PARTITION_YEAR}..extract(year FROM current_date)::int + 1 LOOP
+        part := 'daily_prices_' || y;
+        CONTINUE WHEN to_regclass(part) IS NOT NULL;
+        lo := make_date(y, 1, 1);
+        hi := make_date(y + 1, 1, 1);
+        IF has_default AND EXISTS (
+            SELECT 1 FROM daily_prices_default WHERE trading_date >= lo AND trading_date < hi
+        ) THEN
+            ALTER TABLE daily_prices DETACH PARTITION daily_prices_default;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF daily_prices FOR VALUES FROM (%L) TO (%L)',
+                part, lo, hi
+            );
+            INSERT INTO daily_prices (id, symbol, trading_date, open, high, low, close, volume)
+            SELECT id, symbol, trading_date, open, high, low, close, volume
+            FROM daily_prices_default WHERE trading_date >= lo AND trading_date < hi;
+            DELETE FROM daily_prices_default WHERE trading_date >= lo AND trading_date < hi;
+            ALTER TABLE daily_prices ATTACH PARTITION daily_prices_default DEFAULT;
+            RAISE NOTICE 'moved % rows out of daily_prices_default', part;
+        ELSE
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF daily_prices FOR VALUES FROM (%L) TO (%L)',
+                part, lo, hi
+            );
+        END IF;
+    END LOOP;
+    IF NOT has_default THEN
+        CREATE TABLE daily_prices_default PARTITION OF daily_prices DEFAULT;
+    END IF;
+END $$;
+"""
+
+# (description, SQL) — applied in order, each in its own transaction
+SCHEMA_UPGRADES: list[tuple[str, str]] = [
+    ("daily_prices OHLC -> double precision", _PRICE_COLUMNS_TO_DOUBLE.format(table="daily_prices")),
+    ("market_indices OHLC -> double precision", _PRICE_COLUMNS_TO_DOUBLE.format(table="market_indices")),
+    # Time-ordered columns keep B-trees: max() and ORDER BY ... LIMIT need
+    # ordered access, which BRIN cannot provide. Drop BRINs built by earlier runs.
+    (
+        "daily_prices trading_date B-tree",
+        "CREATE INDEX IF NOT EXISTS ix_daily_prices_trading_date ON daily_prices (trading_date)",
+    ),
+    (
+        "collection_logs started_at B-tree",
+        "CREATE INDEX IF NOT EXISTS ix_collection_logs_started ON collection_logs (started_at)",
+    ),
+    (
+        "market_indices trading_date B-tree",
+        "CREATE INDEX IF NOT EXISTS ix_market_index_trading_date ON market_indices (trading_date)",
+    ),
+    ("drop daily_prices trading_date BRIN", "DROP INDEX IF EXISTS ix_daily_prices_trading_date_brin"),
+    ("drop market_indices trading_date BRIN", "DROP INDEX IF EXISTS ix_market_index_trading_date_brin"),
+    ("drop collection_logs started_at BRIN", "DROP INDEX IF EXISTS ix_collection_logs_started_brin"),
+    ("daily_prices yearly partitions", _DAILY_PRICE_PARTITIONS),
+    # raw_data JSONB: lz4 TOAST compression instead of pglz (PostgreSQL 14+;
+    # applies to values written from now on)
+    (
+        "financial_income_statements raw_data lz4",
+        "ALTER TABLE financial_income_statements ALTER COLUMN raw_data SET COMPRESSION lz4",
+    ),
+    (
+        "financial_balance_sheets raw_data lz4",
+        "ALTER TABLE financial_balance_sheets ALTER COLUMN raw_data SET COMPRESSION lz4",
+    ),
+    # Timestamps filled in by the server instead of bound from Python
+    (
+        "stock_listings timestamp defaults",
+        "ALTER TABLE stock_listings "
+        "ALTER COLUMN created_at SET DEFAULT timezone('utc', now()), "
+        "ALTER COLUMN updated_at SET DEFAULT timezone('utc', now())",
+    ),
+    (
+        "collection_logs started_at default",
+        "ALTER TABLE collection_logs ALTER COLUMN started_at SET DEFAULT timezone('utc', now())",
+    ),
+    # Single-column symbol indexes are prefixes of the composite indexes
+    ("drop daily_prices symbol index", "DROP INDEX IF EXISTS ix_daily_prices_symbol"),
+    (
+        "drop financial_income_statements symbol index",
+        "DROP INDEX IF EXISTS ix_financial_income_statements_symbol",
+    ),
+    (
+        "drop financial_balance_sheets symbol index",
+        "DROP INDEX IF EXISTS ix_financial_balance_sheets_symbol",
+    ),
+    # Same columns as uq_market_index_date
+    ("drop market_indices name/date index", "DROP INDEX IF EXISTS ix_market_index_name_date"),
+]
+
+
+def run_schema_upgrades(engine: Engine) -> None:
+    """Apply SCHEMA_UPGRADES; a failing step is logged and skipped."""
+    for description, sql in SCHEMA_UPGRADES:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(sql))
+            logger.debug("Schema upgrade applied: %s", description)
+        except Exception as e:
+            logger.warning("Schema upgrade failed (%s): %s", description, e)